@@ -0,0 +1,133 @@
+# compression.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""Compression of difference files of text extracted from emails.
+
+Difference files, and records in the difference store, may be compressed by
+gzip, lzma, or bz2.  The compression is found from the first bytes of the
+file so compressed and uncompressed files can be in the same directory.
+
+Running this module rewrites the difference files in a directory with the
+named compression, or without compression if the name is 'none':
+
+python -m emailextract.core.compression <extracted> gzip|lzma|bz2|none
+
+Records in a difference store are not rewritten.
+
+"""
+
+import io
+import os
+import bz2
+import gzip
+import lzma
+
+# The compressions which can be named in the extract configuration file.
+GZIP = "gzip"
+LZMA = "lzma"
+BZ2 = "bz2"
+COMPRESSIONS = (GZIP, LZMA, BZ2)
+
+# The first bytes of files compressed by each compression.  The lzma module
+# writes the xz format by default.
+_MAGIC = ((b"\x1f\x8b", GZIP), (b"\xfd7zXZ\x00", LZMA), (b"BZh", BZ2))
+_MAGIC_LENGTH = max(len(magic) for magic, compression in _MAGIC)
+
+_COMPRESS = {GZIP: gzip.compress, LZMA: lzma.compress, BZ2: bz2.compress}
+
+
+def compression_of(data):
+    """Return compression of data, given the first bytes, or None."""
+    for magic, compression in _MAGIC:
+        if data.startswith(magic):
+            return compression
+    return None
+
+
+def compress(data, compression):
+    """Return data, a bytes object, compressed by compression.
+
+    data is returned unchanged if compression is None.
+
+    """
+    if compression is None:
+        return data
+    return _COMPRESS[compression](data)
+
+
+def open_decompressed(file):
+    """Return binary file object which reads file decompressed.
+
+    file is a seekable binary file object.  The compression is found from the
+    first bytes of file, and file is returned if it is not compressed.  The
+    returned file object decompresses file as it is read.
+
+    """
+    compression = compression_of(file.read(_MAGIC_LENGTH))
+    file.seek(0)
+    if compression == GZIP:
+        return gzip.GzipFile(fileobj=file, mode="rb")
+    if compression == LZMA:
+        return lzma.LZMAFile(file)
+    if compression == BZ2:
+        return bz2.BZ2File(file)
+    return file
+
+
+def decompress(data):
+    """Return data, a bytes object, decompressed if it is compressed."""
+    if compression_of(data[:_MAGIC_LENGTH]) is None:
+        return data
+    return open_decompressed(io.BytesIO(data)).read()
+
+
+def recompress_directory(directory, compression):
+    """Rewrite files in directory with compression, None meaning none.
+
+    Files which already have the compression are not rewritten.  Return the
+    number of files rewritten.
+
+    Records in a difference store are not rewritten: unpack the store to a
+    directory, rewrite the files, and pack the directory into the store.
+
+    """
+    rewritten = 0
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        with open(path, "rb") as file:
+            if compression_of(file.read(_MAGIC_LENGTH)) == compression:
+                continue
+            file.seek(0)
+            data = compress(open_decompressed(file).read(), compression)
+        temporary = path + ".recompress"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+        rewritten += 1
+    return rewritten
+
+
+if __name__ == "__main__":
+
+    import sys
+
+    if len(sys.argv) != 3 or sys.argv[2] not in COMPRESSIONS + ("none",):
+        raise SystemExit(
+            "".join(
+                (
+                    "usage: python -m emailextract.core.compression ",
+                    "<extracted> ",
+                    "|".join(COMPRESSIONS + ("none",)),
+                )
+            )
+        )
+    try:
+        count = recompress_directory(
+            sys.argv[1], None if sys.argv[2] == "none" else sys.argv[2]
+        )
+        print(count, "files rewritten in", sys.argv[1])
+    except (OSError, EOFError, lzma.LZMAError) as exc:
+        raise SystemExit(str(exc)) from exc
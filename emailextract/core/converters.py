@@ -0,0 +1,163 @@
+# converters.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""Run external programs which convert email attachments to text.
+
+The number of programs running at the same time, the time each may take,
+and on POSIX systems the memory and processor time each may use, can be
+limited.
+
+The memory and processor time limits are set by running the program under
+prlimit, or a shell ulimit command if prlimit is not available, rather than
+in the child process before the program is run: that is not safe when the
+scheduler is used by several threads.
+
+A program which is stopped, or cannot be started, is reported in the result
+of the run rather than by an exception.
+
+"""
+
+import os
+import shutil
+import subprocess
+import multiprocessing
+
+# Run the program in "$@" with the limits set by the ulimit commands.
+_ULIMIT_SCRIPT = 'exec "$@"'
+
+
+class ConverterResult:
+    """Outcome of running a converter program."""
+
+    def __init__(self, returncode, stdout=None, error=None):
+        """Note return code, captured stdout, and reason for failure.
+
+        returncode is None if the program was stopped by the scheduler or
+        could not be started, and error says why.
+
+        """
+        self.returncode = returncode
+        self.stdout = stdout
+        self.error = error
+
+    @property
+    def failure(self):
+        """Return reason program was stopped or not run, or None.
+
+        A program which ran to completion and returned a non-zero return
+        code is not counted as stopped.
+
+        """
+        if self.error is not None:
+            return self.error
+        if self.returncode is not None and self.returncode < 0:
+            return "".join(("killed by signal ", str(-self.returncode)))
+        return None
+
+
+class ConverterScheduler:
+    """Run converter programs within time, memory, and concurrency limits.
+
+    The concurrency limit applies to all the processes given the scheduler
+    when they are created, so extract worker processes share it with the
+    application process.
+
+    """
+
+    def __init__(
+        self,
+        max_concurrent=None,
+        timeout=None,
+        memory_limit=None,
+        cpu_limit=None,
+    ):
+        """Set limits for converter programs; None means no limit.
+
+        max_concurrent - number of programs running at the same time
+        timeout - wall clock seconds allowed for each program
+        memory_limit - megabytes of address space allowed for each program
+        cpu_limit - processor seconds allowed for each program
+
+        memory_limit and cpu_limit are ignored except on POSIX systems.
+
+        """
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self._slots = self._create_slots()
+
+    def _create_slots(self):
+        """Return semaphore limiting concurrent programs or None.
+
+        The semaphore can be given to processes started by the spawn method
+        when they are created, but cannot be pickled at other times.
+
+        """
+        if self.max_concurrent:
+            return multiprocessing.get_context("spawn").BoundedSemaphore(
+                self.max_concurrent
+            )
+        return None
+
+    def _limited_args(self, args):
+        """Return args to run program in args within memory and cpu limits."""
+        if os.name != "posix" or not (self.memory_limit or self.cpu_limit):
+            return args
+        if shutil.which("prlimit"):
+            limits = ["prlimit"]
+            if self.memory_limit:
+                limits.append("--as=" + str(self.memory_limit * 1024 * 1024))
+            if self.cpu_limit:
+                limits.append("--cpu=" + str(self.cpu_limit))
+            return limits + ["--"] + list(args)
+        script = [_ULIMIT_SCRIPT]
+        if self.cpu_limit:
+            script.insert(0, "ulimit -t " + str(self.cpu_limit))
+        if self.memory_limit:
+            script.insert(0, "ulimit -v " + str(self.memory_limit * 1024))
+        return ["/bin/sh", "-c", " && ".join(script), "sh"] + list(args)
+
+    def run(self, args, cwd=None, input_=None, capture=False):
+        """Run program in args and return a ConverterResult.
+
+        input_ is bytes given to the program on stdin and capture says if
+        stdout is captured in the result.
+
+        """
+        limited_args = self._limited_args(args)
+        if limited_args is not args and shutil.which(args[0]) is None:
+
+            # The program is run by prlimit or sh so it's absence would be
+            # reported by a return code rather than OSError.
+            return ConverterResult(
+                None,
+                error="".join(("could not be run: ", args[0], " not found")),
+            )
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            process = subprocess.run(
+                limited_args,
+                cwd=cwd,
+                input=input_,
+                stdout=subprocess.PIPE if capture else None,
+                timeout=self.timeout,
+                check=False,
+            )
+        except subprocess.TimeoutExpired:
+            return ConverterResult(
+                None,
+                error="".join(
+                    ("stopped after ", str(self.timeout), " seconds")
+                ),
+            )
+        except OSError as exc:
+            return ConverterResult(
+                None, error="".join(("could not be run: ", str(exc)))
+            )
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+        return ConverterResult(process.returncode, stdout=process.stdout)
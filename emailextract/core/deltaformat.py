@@ -0,0 +1,231 @@
+# deltaformat.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""Compact delta format for difference files of text extracted from emails.
+
+A difference file in ndiff format holds every line of the original text with
+a two character prefix, and edited lines twice with '?' hint lines.  A delta
+holds the original text once followed by the edits as hunks:
+
+#emailextract-delta 1
+<original line count> <hunk count> <ending>
+<original lines>
+@ <first original line replaced> <lines replaced> <lines added>
+<added lines>
+
+Hunks are in original line order and the numbers count from 0.  ending is 0
+if all lines end with a newline, 1 if the last original line does not, and 2
+if the last added line does not.
+
+The ndiff lines given for a delta by expand_delta restore the same original
+and edited text as the ndiff lines given to compact_delta, but without the '?'
+hint lines and with the '- ' lines of each hunk before the '+ ' lines.
+
+Running this module converts the ndiff difference files in a directory to
+deltas, compressed as the ndiff files were:
+
+python -m emailextract.core.deltaformat <extracted>
+
+"""
+
+import io
+import os
+
+from .compression import compression_of, compress, decompress
+
+# The first line of a difference file in delta format.
+DELTA_MAGIC = "#emailextract-delta 1\n"
+
+_HUNK = "@"
+
+# The tags which start ndiff lines.  "? " lines are hints and are not needed
+# to restore the original or edited text.  A hint can contain '\r' so the
+# lines after a hint which do not start with a tag are part of the hint.
+_HINT = "? "
+_TAGS = frozenset(("  ", "- ", "+ ", _HINT))
+
+# The ending values in the count line of a delta.
+_NEWLINE = 0
+_NO_NEWLINE = 1
+_NO_ADDED_NEWLINE = 2
+
+
+def is_delta(lines):
+    """Return True if lines, from a difference file, are a delta."""
+    return bool(lines) and lines[0] == DELTA_MAGIC
+
+
+def compact_delta(differences):
+    """Return delta, a str, for differences, a list of ndiff lines.
+
+    differences is split into lines at universal newlines first, as happens
+    when the ndiff lines are written to a difference file and read back.
+
+    ValueError is raised if a line does not start with an ndiff tag and is
+    not part of a hint.
+
+    """
+    original = []
+    hunks = []
+    replaced = 0
+    added = []
+    ending = _NEWLINE
+    hint = False
+    lines = io.StringIO("".join(differences), newline=None).readlines()
+    for number, line in enumerate(lines, start=1):
+        tag = line[:2]
+        if tag not in _TAGS:
+            if hint:
+                continue
+            raise ValueError(
+                "".join(("Line ", str(number), " is not an ndiff line"))
+            )
+        hint = tag == _HINT
+        if tag == "+ ":
+            ending = _NEWLINE if line.endswith("\n") else _NO_ADDED_NEWLINE
+        elif tag in ("  ", "- "):
+            ending = _NEWLINE if line.endswith("\n") else _NO_NEWLINE
+        if tag == "  ":
+            if replaced or added:
+                hunks.append((len(original) - replaced, replaced, added))
+                replaced = 0
+                added = []
+            original.append(line[2:])
+        elif tag == "- ":
+            original.append(line[2:])
+            replaced += 1
+        elif tag == "+ ":
+            added.append(line[2:])
+    if replaced or added:
+        hunks.append((len(original) - replaced, replaced, added))
+    if ending == _NO_ADDED_NEWLINE:
+        added[-1] += "\n"
+    elif ending == _NO_NEWLINE:
+        original[-1] += "\n"
+    delta = [
+        DELTA_MAGIC,
+        " ".join((str(len(original)), str(len(hunks)), str(ending))),
+        "\n",
+    ]
+    delta.extend(original)
+    for start, count, lines in hunks:
+        delta.append(
+            " ".join((_HUNK, str(start), str(count), str(len(lines))))
+        )
+        delta.append("\n")
+        delta.extend(lines)
+    return "".join(delta)
+
+
+def expand_delta(lines):
+    """Return list of ndiff lines for delta lines, which start DELTA_MAGIC.
+
+    ValueError is raised if lines is not a valid delta.
+
+    """
+    counts = lines[1].split()
+    if len(counts) != 3:
+        raise ValueError("Delta does not have a valid count line")
+    length, hunk_count, ending = (int(c) for c in counts)
+    position = 2 + length
+    original = lines[2:position]
+    if len(original) != length:
+        raise ValueError("Delta has fewer original lines than expected")
+    if ending == _NO_NEWLINE and original:
+        original[-1] = original[-1][:-1]
+    differences = []
+    done = 0
+    last_added = None
+    for _ in range(hunk_count):
+        hunk = lines[position].split()
+        if len(hunk) != 4 or hunk[0] != _HUNK:
+            raise ValueError("Delta does not have a valid hunk line")
+        start, replaced, added = (int(h) for h in hunk[1:])
+        if start < done or start + replaced > length:
+            raise ValueError("Delta hunk is out of order")
+        position += 1
+        differences.extend("  " + line for line in original[done:start])
+        done = start + replaced
+        differences.extend("- " + line for line in original[start:done])
+        if position + added > len(lines):
+            raise ValueError("Delta has fewer added lines than expected")
+        differences.extend(
+            "+ " + line for line in lines[position : position + added]
+        )
+        position += added
+        if added:
+            last_added = len(differences) - 1
+    if position != len(lines):
+        raise ValueError("Delta has more lines than expected")
+    differences.extend("  " + line for line in original[done:])
+    if ending == _NO_ADDED_NEWLINE and last_added is not None:
+        differences[last_added] = differences[last_added][:-1]
+    return differences
+
+
+def _read_lines(path):
+    """Return (lines, compression) for difference file at path.
+
+    The file is decompressed and decoded like emailextract reads it.
+
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    compression = compression_of(data)
+    data = decompress(data)
+    for charset in "utf-8", "iso-8859-1":
+        try:
+            lines = io.TextIOWrapper(
+                io.BytesIO(data), encoding=charset, newline=None
+            ).readlines()
+            return lines, compression
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("".join(("Unable to decode '", path, "'")))
+
+
+def compact_directory(directory):
+    """Convert ndiff difference files in directory to deltas.
+
+    Each file is replaced by a new file, with the same compression, so a
+    file is either converted or left as it was if the conversion fails.
+    ValueError is raised for the first file which is not a difference file,
+    and the files after it are not converted.
+
+    Return the number of files converted.
+
+    """
+    converted = 0
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        lines, compression = _read_lines(path)
+        if is_delta(lines):
+            continue
+        try:
+            delta = compact_delta(lines)
+        except ValueError as exc:
+            raise ValueError("".join((path, ": ", str(exc)))) from exc
+        temporary = path + ".compact"
+        with open(temporary, mode="wb") as file:
+            file.write(compress(delta.encode("utf8"), compression))
+        os.replace(temporary, path)
+        converted += 1
+    return converted
+
+
+if __name__ == "__main__":
+
+    import sys
+    import lzma
+
+    if len(sys.argv) != 2:
+        raise SystemExit(
+            "usage: python -m emailextract.core.deltaformat <extracted>"
+        )
+    try:
+        print(compact_directory(sys.argv[1]), "files converted to deltas")
+    except (OSError, ValueError, EOFError, lzma.LZMAError) as exc:
+        raise SystemExit(str(exc)) from exc
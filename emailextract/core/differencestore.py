@@ -0,0 +1,198 @@
+# differencestore.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""Difference files of text extracted from emails held in a sqlite3 database.
+
+The store holds, for an event, the records which would otherwise be files in
+the extracted directory: one record per email keyed by the difference file
+name.  The record is the bytes which would be in the file so records can be
+moved between the store and the extracted directory without change.
+
+The store also holds fingerprints of the text extracted from emails whose
+records were found to hold that text.  A fingerprint is removed when it's
+record is replaced.
+
+Records are moved by running this module:
+
+python -m emailextract.core.differencestore pack <extracted> <store>
+python -m emailextract.core.differencestore unpack <store> <extracted>
+
+pack adds all the files in the extracted directory to the store database, and
+unpack writes all the records in the store database to files in the extracted
+directory.  The existing files or records are replaced.
+
+"""
+
+import os
+import sqlite3
+
+_CREATE_TABLE = "".join(
+    (
+        "create table if not exists difference (",
+        "name text primary key, ",
+        "data blob)",
+    )
+)
+_SELECT = "select data from difference where name = ?"
+_EXISTS = "select count(*) from difference where name = ?"
+_SELECT_NAMES = "select name from difference order by name"
+_REPLACE = "insert or replace into difference values (?, ?)"
+_CREATE_FINGERPRINT_TABLE = "".join(
+    (
+        "create table if not exists fingerprint (",
+        "name text primary key, ",
+        "digest text)",
+    )
+)
+_SELECT_FINGERPRINTS = "select name, digest from fingerprint"
+_REPLACE_FINGERPRINT = "insert or replace into fingerprint values (?, ?)"
+_DELETE_FINGERPRINT = "delete from fingerprint where name = ?"
+
+
+class DifferenceStoreError(Exception):
+    """Exception class for differencestore module."""
+
+
+class DifferenceStore:
+    """Difference records, keyed by difference file name, for an event."""
+
+    def __init__(self, path):
+        """Note store database path."""
+        self.path = path
+
+    def _connect(self):
+        """Return connection to database, creating tables if needed."""
+        try:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute(_CREATE_TABLE)
+            connection.execute(_CREATE_FINGERPRINT_TABLE)
+        except sqlite3.Error as exc:
+            raise DifferenceStoreError(str(exc)) from exc
+        return connection
+
+    def _fetch(self, statement, parameters=()):
+        """Return all rows selected by statement with parameters."""
+        connection = self._connect()
+        try:
+            return connection.execute(statement, parameters).fetchall()
+        except sqlite3.Error as exc:
+            raise DifferenceStoreError(str(exc)) from exc
+        finally:
+            connection.close()
+
+    def get(self, name):
+        """Return bytes of record for name or None if not in store."""
+        rows = self._fetch(_SELECT, (name,))
+        if not rows:
+            return None
+        return rows[0][0]
+
+    def exists(self, name):
+        """Return True if a record for name is in store."""
+        return bool(self._fetch(_EXISTS, (name,))[0][0])
+
+    def names(self):
+        """Return list of names of records in store."""
+        return [row[0] for row in self._fetch(_SELECT_NAMES)]
+
+    def put_all(self, records):
+        """Add (name, bytes) records in one transaction.
+
+        None of the records are added if any cannot be added.  The
+        fingerprints of the replaced records are removed.
+
+        """
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(_REPLACE, records)
+                connection.executemany(
+                    _DELETE_FINGERPRINT, [(r[0],) for r in records]
+                )
+        except sqlite3.Error as exc:
+            raise DifferenceStoreError(str(exc)) from exc
+        finally:
+            connection.close()
+
+    def get_fingerprints(self):
+        """Return dict of (digest,) keyed by record name.
+
+        Errors in the database are treated as if there are no fingerprints,
+        so the records are read instead.
+
+        """
+        try:
+            rows = self._fetch(_SELECT_FINGERPRINTS)
+        except DifferenceStoreError:
+            return {}
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def put_fingerprints(self, fingerprints):
+        """Add (name, digest) fingerprints in one transaction.
+
+        The database is not changed if it cannot be updated.
+
+        """
+        if not fingerprints:
+            return
+        try:
+            connection = self._connect()
+        except DifferenceStoreError:
+            return
+        try:
+            with connection:
+                connection.executemany(_REPLACE_FINGERPRINT, fingerprints)
+        except sqlite3.Error:
+            pass
+        finally:
+            connection.close()
+
+
+def pack(directory, path):
+    """Add files in directory to store at path and return number added."""
+    records = []
+    for name in sorted(os.listdir(directory)):
+        filepath = os.path.join(directory, name)
+        if not os.path.isfile(filepath):
+            continue
+        with open(filepath, "rb") as file:
+            records.append((name, file.read()))
+    DifferenceStore(path).put_all(records)
+    return len(records)
+
+
+def unpack(path, directory):
+    """Write records in store at path to directory and return their number."""
+    store = DifferenceStore(path)
+    names = store.names()
+    if names:
+        os.makedirs(directory, exist_ok=True)
+    for name in names:
+        with open(os.path.join(directory, name), "wb") as file:
+            file.write(store.get(name))
+    return len(names)
+
+
+if __name__ == "__main__":
+
+    import sys
+
+    if len(sys.argv) != 4 or sys.argv[1] not in ("pack", "unpack"):
+        raise SystemExit(
+            "".join(
+                (
+                    "usage: python -m emailextract.core.differencestore ",
+                    "pack <extracted> <store> | unpack <store> <extracted>",
+                )
+            )
+        )
+    try:
+        if sys.argv[1] == "pack":
+            count = pack(sys.argv[2], sys.argv[3])
+            print(count, "files added to", sys.argv[3])
+        else:
+            count = unpack(sys.argv[2], sys.argv[3])
+            print(count, "records written to", sys.argv[3])
+    except (DifferenceStoreError, OSError) as exc:
+        raise SystemExit(str(exc)) from exc
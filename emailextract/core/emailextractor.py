@@ -19,21 +19,28 @@ email did so.  It depends on which mailbox format the email client uses.
 
 import os
 from datetime import date
+import bisect
 import re
+import fnmatch
 from email import message_from_binary_file
+from email.parser import BytesHeaderParser
 from email.utils import parseaddr, parsedate_tz
 from email.message import EmailMessage
 import email.header
 from time import strftime
-import subprocess
 import io
+import codecs
 import csv
 import difflib
-import shutil
+import tempfile
 import tkinter.messagebox
 import zipfile
-import xml.etree.ElementTree
 import base64
+import concurrent.futures
+import multiprocessing
+import pickle
+import hashlib
+import time
 
 try:
     import tnefparse
@@ -46,7 +53,6 @@ except ImportError:
     xlsx2csv = None
 try:
     import pdfminer
-    from pdfminer import pdfinterp, layout, converter
 except ImportError:
     pdfminer = None
 
@@ -56,6 +62,32 @@ import sys
 
 from solentware_misc.core.utilities import AppSysDate
 
+from .mailstoreindex import (
+    MailstoreIndex,
+    MailstoreIndexError,
+    index_text,
+)
+from .textcache import AttachmentTextCache
+from .fingerprints import DifferenceFingerprints
+from .differencestore import DifferenceStore, DifferenceStoreError
+from .deltaformat import is_delta, compact_delta, expand_delta
+from .compression import (
+    COMPRESSIONS,
+    compress,
+    decompress,
+    open_decompressed,
+)
+from .converters import ConverterScheduler, ConverterResult
+from .pdfengine import PdfMinerEngine, parse_page_ranges
+from .extractors import (
+    Extractor,
+    ExtractorRegistry,
+    COST_CHEAP,
+    COST_PARSE,
+    COST_EXTERNAL,
+)
+from .officexml import iterrecords, XlsxWorkbook
+
 # Directory which holds emails one per file copied from email client mailboxes.
 # Use imported COLLECTED attribute if available because emailextract expects to
 # work with the emailstore package but can work with arbitrary collections of
@@ -167,6 +199,95 @@ MEDIA_TYPES = "media_types"
 # Directory which holds difference files of text extracted from emails.
 EXTRACTED = "extracted"
 
+# The name of the sqlite3 database, in the directory containing the extract
+# configuration file, which indexes the headers of the emails in the collected
+# directory.  Emails are parsed at every selection if not given.
+MAILSTORE_INDEX = "mailstore_index"
+
+# The number of processes used to extract text from the selected emails.
+# Text is extracted in the application process if less than 2.
+EXTRACT_WORKERS = "extract_workers"
+
+# The directory in which a private temporary directory is created for each
+# attachment converted to text by an external program.  The default is the
+# location given by Python's tempfile module, usually TMPDIR or /tmp.
+SCRATCH_DIRECTORY = "scratch_directory"
+
+# The name of the sqlite3 database, in the directory containing the extract
+# configuration file, which caches text extracted from attachments by the
+# converters for pdf, spreadsheet, and document formats.  The maximum total
+# length of text held in the cache is given by TEXT_CACHE_SIZE.
+TEXT_CACHE = "text_cache"
+TEXT_CACHE_SIZE = "text_cache_size"
+
+# The name of the sqlite3 database, in the directory containing the extract
+# configuration file, which holds the difference records of text extracted
+# from emails instead of one file per email in the extracted directory.
+DIFFERENCE_STORE = "difference_store"
+
+# The name of the sqlite3 database, in the directory containing the extract
+# configuration file, which holds fingerprints of the difference files in the
+# extracted directory.  A difference file is not read while it's fingerprint
+# is unchanged.  The fingerprints of difference records are held in the
+# difference store, if there is one, instead.
+DIFFERENCE_FINGERPRINTS = "difference_fingerprints"
+
+# The format of new difference files, and records in the difference store.
+# The only value is _DELTA_FORMAT, which means the original text is held once
+# followed by the edits.  Otherwise the lines of difflib.ndiff() are held.
+# Both formats are read whatever the value.
+DIFFERENCE_FORMAT = "difference_format"
+_DELTA_FORMAT = "delta"
+
+# The compression, gzip or lzma or bz2, of new difference files and records in
+# the difference store.  They are not compressed by default.  Compressed and
+# uncompressed difference files are read whatever the value.
+DIFFERENCE_COMPRESSION = "difference_compression"
+
+# Limits on the external programs, pdftotext and ssconvert, which convert
+# attachments to text.  CONVERTER_TIMEOUT is the seconds allowed for each
+# conversion and CONVERTER_MAX_CONCURRENT is the number of conversions done at
+# the same time by all processes.  CONVERTER_MEMORY_LIMIT, in megabytes, and
+# CONVERTER_CPU_LIMIT, in seconds, are applied on POSIX systems.  There are no
+# limits by default.  A conversion stopped at a limit is noted in the text
+# extracted from the email.
+CONVERTER_TIMEOUT = "converter_timeout"
+CONVERTER_MAX_CONCURRENT = "converter_max_concurrent"
+CONVERTER_MEMORY_LIMIT = "converter_memory_limit"
+CONVERTER_CPU_LIMIT = "converter_cpu_limit"
+
+# The maximum decompressed size, in bytes, of the XML member of a docx, odt,
+# or ods, attachment from which text is extracted.  An attachment with a
+# larger member is not processed: it may be a zip bomb.
+ZIP_MEMBER_SIZE_LIMIT = "zip_member_size_limit"
+
+# The way text is extracted from xlsx attachments.  The only value is
+# _NATIVE_XLSX, which means the workbook is read by Python's xml functions
+# without writing files.  Otherwise ssconvert is used if available, and then
+# xlsx2csv if available.
+XLSX_EXTRACTOR = "xlsx_extractor"
+_NATIVE_XLSX = "native"
+
+# Limits on the pages read from each pdf attachment by pdfminer3k, which is
+# used if pdftotext is not available.  PDF_PAGES is a comma separated list of
+# page numbers and ranges like '1-3', PDF_PAGE_LIMIT is the number of pages
+# read, and PDF_TIME_LIMIT is the seconds allowed for reading the pages.  An
+# attachment stopped at the time limit is noted in the text extracted from
+# the email.
+PDF_PAGES = "pdf_pages"
+PDF_PAGE_LIMIT = "pdf_page_limit"
+PDF_TIME_LIMIT = "pdf_time_limit"
+
+# The number of characters at the start of csv text, from a csv attachment or
+# a sheet of a spreadsheet attachment, given to csv.Sniffer to find the csv
+# dialect.  The whole text is given if CSV_SNIFF_SAMPLE is 0.  The dialect
+# found is used for later csv text with the same sample.  CSV_DIALECT names
+# a dialect known to the csv module, 'excel' for example, and means all csv
+# text is accepted without using csv.Sniffer.  The dialect is not otherwise
+# used because accepted csv text is included unchanged, not read as rows.
+CSV_SNIFF_SAMPLE = "csv_sniff_sample"
+CSV_DIALECT = "csv_dialect"
+
 # Identify a pdf content-type to be included in the extracted data
 PDF_CONTENT_TYPE = "pdf_content_type"
 
@@ -215,10 +336,10 @@ ODS_CONTENT_TYPE = "ods_content_type"
 # Non-TNEF can use content-type for attachment directly but TNEF is
 # content-type application/ms-tnef and we use the extension to decide.  The
 # non-TNEF version sets the appropriate constant below.
-# _SS is any spreadsheet, so do not set to an extension: cannot use TNEF here.
+# _SS is any spreadsheet, so it is not an extension: cannot use TNEF here.
 # TNEF means emails sent by Microsoft Outlook in some circumstances.
 _PDF = ".pdf"
-_SS = None
+_SS = "spreadsheet"
 _XLSX = ".xlsx"
 _ODS = ".ods"
 _CSV = ".csv"
@@ -226,11 +347,60 @@ _TXT = ".txt"
 _DOCX = ".docx"
 _ODT = ".odt"
 
+# The kinds of attachment converted by ssconvert, if available, before text
+# is extracted from the selected emails.
+_SSCONVERT_KINDS = frozenset((_SS, _XLSX, _ODS))
+
+# The number of bytes decoded at a time while finding the charset which can
+# decode a csv attachment or file.
+_DECODE_CHUNK_SIZE = 1048576
+
+# The csv_sniff_sample used if the configuration file does not give one.
+_DEFAULT_CSV_SNIFF_SAMPLE = 100000
+
+# The zip_member_size_limit used if the configuration file does not give one.
+_DEFAULT_ZIP_MEMBER_SIZE_LIMIT = 200000000
+
+# Change when a change to a converter changes the text extracted, so text
+# from the earlier version of the converter is not taken from the cache.
+_CONVERTER_VERSION = 1
+
+# The sender part of a mailstore filename, yyyymmddHHMMSS<sender><utc>.mbs
+# where utc is the offset from UTC like '+0100'.
+_MAILSTORE_FILENAME = re.compile(r"\A\d{14}(.*)[+-]\d{4}\.mbs\Z", flags=re.S)
+
+# Characters which make an emailsender value a pattern rather than an address.
+_SENDER_WILDCARDS = re.compile(r"[*?[]")
+
+# The ExtractEmail instance, keyed by "extractemail", used by an extract
+# worker process.  Empty in the application process.
+_extract_worker = {}
+
+# Sorts after any character which can follow a date prefix in a filename.
+_AFTER_PREFIX = "\U0010ffff"
+
+# Sorted listings of mailstore directories keyed by directory name.  The
+# cached listing is used while the directory modification time is unchanged.
+_mailstore_listings = {}
+
+# Nanoseconds after the directory modification time before a listing can be
+# cached.  Files added within the timestamp granularity of the filesystem, 2
+# seconds at worst, may not change the modification time.
+_LISTING_MTIME_MARGIN = 2000000000
+
 
 class EmailExtractorError(Exception):
     """Exception class for emailextractor module."""
 
 
+class ZipMemberSizeError(EmailExtractorError):
+    """Exception raised when a zip archive member is too big to extract."""
+
+
+class _WorkerDialogueError(EmailExtractorError):
+    """Exception raised when an extract worker process needs a dialogue."""
+
+
 # There are two distinct sets of configuration settings; email selection and
 # parsing rules. EmailExtractor will end up a subclass of "Parse" which can be
 # shared with EventSeason for text parsing rules.
@@ -326,6 +496,16 @@ class EmailExtractor:
                 return None
         return self.email_client.excluded_emails
 
+    def extract_text(self):
+        """Extract text from selected emails in worker processes if allowed.
+
+        The text is extracted in the application process when first needed
+        if extraction by worker processes is not done.
+
+        """
+        if self.selected_emails:
+            self.email_client.extract_selected_emails()
+
     @property
     def eventdirectory(self):
         """Return the path name of the document directory."""
@@ -342,27 +522,64 @@ class EmailExtractor:
         Each email file in the collected directory will have a corresponding
         text difference file in the extracted directory.
 
+        A difference file is not read if it's fingerprint, if fingerprints
+        are kept, shows it has not changed since it was found to hold the
+        text extracted from the email.
+
+        A difference file is not written for an email if an attachment was
+        not converted to text because the converter was stopped or could not
+        be run.
+
         """
         difference_tags = []
         additional = []
-        for e, em in enumerate(self.selected_emails):
-
-            # The interaction between universal newlines and difflib can cause
-            # problems.  In particular when \r is used as a field separator.
-            # This way such text extracted from an email is readable because
-            # \r shows up as a special glyph in the tkinter Text widget.
-            # Later, when processing text, it shows up as a newline (\n).
-            if tuple(
-                (s.rstrip("\r\n"), s[-1] in "\r\n")
-                for s in "\n".join(em.extracted_text).splitlines(True)
-            ) != tuple(
-                (s.rstrip("\r\n"), s[-1] in "\r\n")
-                for s in list(difflib.restore(em.edit_differences, 1))
-            ):
-                difference_tags.append("x".join(("T", str(e))))
+        not_converted = []
+        self.extract_text()
+        fingerprints = self.email_client.difference_fingerprints
+        if fingerprints is None:
+            recorded = {}
+        else:
+            recorded = fingerprints.get_fingerprints()
+        unchanged = []
+        try:
+            for e, em in enumerate(self.selected_emails):
+                if fingerprints is None:
+                    fingerprint = None
+                else:
+                    fingerprint = em.difference_fingerprint
+                if fingerprint is not None:
+                    if recorded.get(fingerprint[0]) == fingerprint[1:]:
+                        continue
 
-            if em.difference_file_exists is False:
-                additional.append(em)
+                # The interaction between universal newlines and difflib can
+                # cause problems.  In particular when \r is used as a field
+                # separator.  This way such text extracted from an email is
+                # readable because \r shows up as a special glyph in the
+                # tkinter Text widget.  Later, when processing text, it shows
+                # up as a newline (\n).
+                if tuple(
+                    (s.rstrip("\r\n"), s[-1] in "\r\n")
+                    for s in "\n".join(em.extracted_text).splitlines(True)
+                ) != tuple(
+                    (s.rstrip("\r\n"), s[-1] in "\r\n")
+                    for s in list(difflib.restore(em.edit_differences, 1))
+                ):
+                    difference_tags.append("x".join(("T", str(e))))
+                elif fingerprint is not None and em.difference_file_exists:
+                    unchanged.append(fingerprint)
+
+                if em.difference_file_exists is False:
+                    if em.conversion_failures:
+                        not_converted.append(em)
+                    else:
+                        additional.append(em)
+        except DifferenceStoreError as exc:
+            self._report_difference_store_failure("Read", exc)
+            return None
+        if fingerprints is not None:
+            fingerprints.put_fingerprints(unchanged)
+        if not_converted:
+            self._report_emails_not_converted(not_converted)
         if difference_tags:
             return difference_tags, None
         if additional:
@@ -385,6 +602,19 @@ class EmailExtractor:
                 return None
         else:
             return None, additional
+        store = self.email_client.difference_store
+        if store is not None:
+            try:
+                store.put_all([em.difference_record for em in additional])
+            except DifferenceStoreError as exc:
+                self._report_difference_store_failure("Write", exc)
+                return None
+            for em in additional:
+                em.difference_file_exists = True
+            store.put_fingerprints(
+                [em.difference_fingerprint for em in additional]
+            )
+            return None, additional
         try:
             os.mkdir(os.path.dirname(additional[0].difference_file_path))
         except FileExistsError:
@@ -406,8 +636,70 @@ class EmailExtractor:
                     ),
                 )
                 return None
+        if fingerprints is not None:
+            fingerprints.put_fingerprints(
+                [em.difference_fingerprint for em in additional]
+            )
         return None, additional
 
+    def _report_emails_not_converted(self, emails):
+        """Report emails whose text is not added because of converters."""
+        tkinter.messagebox.showinfo(
+            parent=self.parent,
+            title="Update Extracted Text",
+            message="".join(
+                (
+                    "Text from these emails is not added because an ",
+                    "attachment was not converted:\n\n",
+                    "\n".join(
+                        os.path.basename(em.filename) for em in emails[:10]
+                    ),
+                    "\n...\n" if len(emails) > 10 else "\n",
+                    "\nThe reasons are given in the extracted text.",
+                )
+            ),
+        )
+
+    def _report_difference_store_failure(self, action, exc):
+        """Report failure of action on difference store because of exc."""
+        tkinter.messagebox.showinfo(
+            parent=self.parent,
+            title="Update Extracted Text",
+            message="".join(
+                (
+                    action,
+                    " difference records in\n\n",
+                    self.email_client.difference_store.path,
+                    "\n\nfailed because\n\n",
+                    str(exc),
+                )
+            ),
+        )
+
+    def difference_exists(self, filename):
+        """Return True if difference for filename is in extracted directory.
+
+        The difference store is searched instead if it is used.
+
+        """
+        store = self.email_client.difference_store
+        if store is not None:
+            try:
+                return store.exists(filename)
+            except DifferenceStoreError:
+                return False
+        return os.path.exists(
+            os.path.join(os.path.expanduser(self.outputdirectory), filename)
+        )
+
+    @property
+    def difference_location(self):
+        """Return path name of difference store or extracted directory."""
+        store = self.email_client.difference_store
+        if store is not None:
+            return store.path
+        return os.path.expanduser(self.outputdirectory)
+
     def ignore_email(self, filename):
         """Add email to list of ignored emails."""
         if self.email_client.ignore is None:
@@ -442,6 +734,26 @@ class Parser:
             COLLECTED: self.assign_value,
             EXTRACTED: self.assign_value,
             MEDIA_TYPES: self.assign_value,
+            MAILSTORE_INDEX: self.assign_value,
+            EXTRACT_WORKERS: self.assign_int_value,
+            SCRATCH_DIRECTORY: self.assign_value,
+            TEXT_CACHE: self.assign_value,
+            TEXT_CACHE_SIZE: self.assign_int_value,
+            DIFFERENCE_STORE: self.assign_value,
+            DIFFERENCE_FINGERPRINTS: self.assign_value,
+            DIFFERENCE_FORMAT: self.assign_value,
+            DIFFERENCE_COMPRESSION: self.assign_value,
+            CONVERTER_TIMEOUT: self.assign_int_value,
+            CONVERTER_MAX_CONCURRENT: self.assign_int_value,
+            CONVERTER_MEMORY_LIMIT: self.assign_int_value,
+            CONVERTER_CPU_LIMIT: self.assign_int_value,
+            ZIP_MEMBER_SIZE_LIMIT: self.assign_int_value,
+            XLSX_EXTRACTOR: self.assign_value,
+            PDF_PAGES: self.assign_value,
+            PDF_PAGE_LIMIT: self.assign_int_value,
+            PDF_TIME_LIMIT: self.assign_int_value,
+            CSV_SNIFF_SAMPLE: self.assign_int_value,
+            CSV_DIALECT: self.assign_value,
             PDF_CONTENT_TYPE: self.add_value_to_set,
             TEXT_CONTENT_TYPE: self.add_value_to_set,
             _SS_CONTENT_TYPE: self.add_value_to_set,
@@ -460,6 +772,10 @@ class Parser:
         """Set dict item args[args_key] to v from configuration file."""
         args[args_key] = v
 
+    def assign_int_value(self, v, args, args_key):
+        """Set dict item args[args_key] to int(v) from configuration file."""
+        args[args_key] = int(v)
+
     def add_value_to_set(self, v, args, args_key):
         """Add v, from configuration file, to set args[args_key]."""
         if args_key not in args:
@@ -516,6 +832,68 @@ class Parser:
         return args
 
 
+class SenderMatcher:
+    """Match email addresses against the emailsender rules.
+
+    A rule is an email address, '*@<domain>' for any address in the domain,
+    or a pattern using the '*', '?', and '[...]' wildcards understood by the
+    fnmatch module.
+
+    The rules are compiled once so the cost of matching an address does not
+    depend on the number of rules.
+
+    """
+
+    def __init__(self, rules):
+        """Compile rules into address and domain sets and a pattern."""
+        self.addresses = set()
+        self.domains = set()
+        patterns = []
+        for rule in rules:
+            rule = rule.strip()
+            if not _SENDER_WILDCARDS.search(rule):
+                self.addresses.add(rule)
+            elif rule.startswith("*@") and not _SENDER_WILDCARDS.search(
+                rule[2:]
+            ):
+                self.domains.add(rule[2:].lower())
+            else:
+                patterns.append(fnmatch.translate(rule))
+        if patterns:
+            self.pattern = re.compile("|".join(patterns))
+        else:
+            self.pattern = None
+
+    def __bool__(self):
+        """Return True if there are any rules."""
+        return bool(self.addresses or self.domains or self.pattern)
+
+    def __contains__(self, address):
+        """Return True if address is matched by a rule."""
+        if address in self.addresses:
+            return True
+        if self.domains:
+            if address.rpartition("@")[-1].lower() in self.domains:
+                return True
+        if self.pattern is not None:
+            if self.pattern.match(address):
+                return True
+        return False
+
+    def match_filename(self, filename):
+        """Return True if sender part of mailstore filename is matched.
+
+        Filenames not in the yyyymmddHHMMSS<sender><utc offset>.mbs format
+        are matched because the sender is not known without reading the
+        email.
+
+        """
+        match = _MAILSTORE_FILENAME.match(filename)
+        if match is None:
+            return True
+        return match.group(1) in self
+
+
 class MessageFile(EmailMessage):
     """Extend EmailMessage class with a method to generate a filename.
 
@@ -534,6 +912,35 @@ class MessageFile(EmailMessage):
         return False
 
 
+class _SizeLimitedReader:
+    """Binary file reader which raises ZipMemberSizeError beyond a limit."""
+
+    def __init__(self, file, name, limit):
+        """Note file, it's name in the zip archive, and limit on bytes read."""
+        self._file = file
+        self._name = name
+        self._limit = limit
+        self._size = 0
+
+    def __enter__(self):
+        """Return self as context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close file on exit from context."""
+        self._file.close()
+
+    def read(self, size=-1):
+        """Return up to size bytes, or all remaining bytes if size < 0."""
+        if size is None or size < 0:
+            size = self._limit + 1 - self._size
+        data = self._file.read(size)
+        self._size += len(data)
+        if self._size > self._limit:
+            raise _zip_member_size_error(self._name, self._limit)
+        return data
+
+
 class ExtractEmail:
     """Extract emails matching selection criteria from email store."""
 
@@ -561,6 +968,26 @@ class ExtractEmail:
         exclude_csv_file=None,
         include_ss_file_sheet=None,
         exclude_ss_file_sheet=None,
+        mailstore_index=None,
+        extract_workers=None,
+        scratch_directory=None,
+        text_cache=None,
+        text_cache_size=None,
+        converter_timeout=None,
+        converter_max_concurrent=None,
+        converter_memory_limit=None,
+        converter_cpu_limit=None,
+        zip_member_size_limit=None,
+        xlsx_extractor=None,
+        pdf_pages=None,
+        pdf_page_limit=None,
+        pdf_time_limit=None,
+        csv_sniff_sample=None,
+        csv_dialect=None,
+        difference_store=None,
+        difference_fingerprints=None,
+        difference_format=None,
+        difference_compression=None,
         parent=None,
         **soak
     ):
@@ -572,6 +999,26 @@ class ExtractEmail:
         emailsender - iterable of from addressees to select emails
         eventdirectory - directory to contain the event's data
         ignore - iterable of email filenames to be ignored
+        mailstore_index - name of index database for emails in mailstore
+        extract_workers - number of processes used to extract text
+        scratch_directory - where temporary files for converters are put
+        text_cache - name of cache database for text from attachments
+        text_cache_size - maximum total length of text in text_cache
+        converter_timeout - seconds allowed for each external conversion
+        converter_max_concurrent - number of conversions run at same time
+        converter_memory_limit - megabytes allowed for each conversion
+        converter_cpu_limit - processor seconds allowed for each conversion
+        zip_member_size_limit - bytes allowed for XML in docx, odt, and ods
+        xlsx_extractor - "native" to read xlsx attachments without ssconvert
+        pdf_pages - page numbers and ranges read by pdfminer3k, like "1-3,5"
+        pdf_page_limit - number of pages read by pdfminer3k
+        pdf_time_limit - seconds allowed for pdfminer3k to read the pages
+        csv_sniff_sample - characters of csv text used to find it's dialect
+        csv_dialect - name of csv dialect: if given csv text is not sniffed
+        difference_store - name of database holding difference records
+        difference_fingerprints - name of database of difference fingerprints
+        difference_format - "delta" to write differences as original and edits
+        difference_compression - compression of difference files written
         schedule - difference file for event schedule
         reports - difference file for event result reports
 
@@ -650,6 +1097,10 @@ class ExtractEmail:
         else:
             self.mostrecentdate = mostrecentdate
         self.emailsender = emailsender
+        if emailsender is None:
+            self.sender_matcher = None
+        else:
+            self.sender_matcher = SenderMatcher(emailsender)
         self.eventdirectory = eventdirectory
         self.ignore = ignore
         self._selected_emails = None
@@ -703,6 +1154,226 @@ class ExtractEmail:
             self.exclude_ss_file_sheet = []
         else:
             self.exclude_ss_file_sheet = exclude_ss_file_sheet
+        if mailstore_index is None:
+            self.mailstore_index = None
+        else:
+            self.mailstore_index = MailstoreIndex(
+                os.path.join(eventdirectory, mailstore_index), self.mailstore
+            )
+        self.extract_workers = extract_workers
+        if scratch_directory is not None:
+            scratch_directory = os.path.expanduser(
+                os.path.expandvars(scratch_directory)
+            )
+            if not os.path.isdir(scratch_directory):
+                tkinter.messagebox.showinfo(
+                    parent=self.parent,
+                    title="Read Configuration File",
+                    message="".join(
+                        (
+                            "The scratch_directory\n\n",
+                            scratch_directory,
+                            "\n\nis not a directory.\n\nThe default ",
+                            "temporary directory is used instead.",
+                        )
+                    ),
+                )
+                scratch_directory = None
+        self.scratch_directory = scratch_directory
+        if text_cache is None:
+            self.text_cache = None
+        else:
+            self.text_cache = AttachmentTextCache(
+                os.path.join(eventdirectory, text_cache),
+                max_size=text_cache_size,
+            )
+        if difference_store is None:
+            self.difference_store = None
+        else:
+            self.difference_store = DifferenceStore(
+                os.path.join(eventdirectory, difference_store)
+            )
+        if self.difference_store is not None:
+            self.difference_fingerprints = self.difference_store
+        elif difference_fingerprints is not None:
+            self.difference_fingerprints = DifferenceFingerprints(
+                os.path.join(eventdirectory, difference_fingerprints)
+            )
+        else:
+            self.difference_fingerprints = None
+        self.converter_scheduler = ConverterScheduler(
+            max_concurrent=converter_max_concurrent,
+            timeout=converter_timeout,
+            memory_limit=converter_memory_limit,
+            cpu_limit=converter_cpu_limit,
+        )
+
+        # The pdftotext supplied with poppler reads the PDF document from
+        # stdin and writes the text to stdout when both file names are '-',
+        # but the one supplied with Xpdf reads only from a file.  None until
+        # pdftotext_reads_stdin() has found out which.
+        self._pdftotext_reads_stdin = None
+        if zip_member_size_limit is None:
+            self.zip_member_size_limit = _DEFAULT_ZIP_MEMBER_SIZE_LIMIT
+        else:
+            self.zip_member_size_limit = zip_member_size_limit
+        if xlsx_extractor not in (None, _NATIVE_XLSX):
+            tkinter.messagebox.showinfo(
+                parent=self.parent,
+                title="Read Configuration File",
+                message="".join(
+                    (
+                        "The only xlsx_extractor is '",
+                        _NATIVE_XLSX,
+                        "'.\n\nThe default is used instead.",
+                    )
+                ),
+            )
+            xlsx_extractor = None
+        self.xlsx_extractor = xlsx_extractor
+        if difference_format not in (None, _DELTA_FORMAT):
+            tkinter.messagebox.showinfo(
+                parent=self.parent,
+                title="Read Configuration File",
+                message="".join(
+                    (
+                        "The only difference_format is '",
+                        _DELTA_FORMAT,
+                        "'.\n\nThe default is used instead.",
+                    )
+                ),
+            )
+            difference_format = None
+        self.difference_format = difference_format
+        if (
+            difference_compression is not None
+            and difference_compression not in COMPRESSIONS
+        ):
+            tkinter.messagebox.showinfo(
+                parent=self.parent,
+                title="Read Configuration File",
+                message="".join(
+                    (
+                        "The difference_compression '",
+                        difference_compression,
+                        "' is not one of '",
+                        "', '".join(COMPRESSIONS),
+                        "'.\n\nDifference files will not be compressed.",
+                    )
+                ),
+            )
+            difference_compression = None
+        self.difference_compression = difference_compression
+        if pdf_pages is not None:
+            try:
+                pdf_pages = parse_page_ranges(pdf_pages)
+            except ValueError:
+                tkinter.messagebox.showinfo(
+                    parent=self.parent,
+                    title="Read Configuration File",
+                    message="".join(
+                        (
+                            "The pdf_pages value '",
+                            pdf_pages,
+                            "' is not a list of page numbers and ranges.",
+                            "\n\nAll pages are read instead.",
+                        )
+                    ),
+                )
+                pdf_pages = None
+        self.pdfminer_engine = PdfMinerEngine(
+            pages=pdf_pages,
+            max_pages=pdf_page_limit,
+            time_limit=pdf_time_limit,
+        )
+        self.extractors = self._create_extractor_registry()
+        if csv_sniff_sample is None:
+            self.csv_sniff_sample = _DEFAULT_CSV_SNIFF_SAMPLE
+        else:
+            self.csv_sniff_sample = csv_sniff_sample
+        if csv_dialect is not None and csv_dialect not in csv.list_dialects():
+            tkinter.messagebox.showinfo(
+                parent=self.parent,
+                title="Read Configuration File",
+                message="".join(
+                    (
+                        "The csv_dialect '",
+                        csv_dialect,
+                        "' is not known to Python's csv module.\n\n",
+                        "The dialect of csv text is found by csv.Sniffer ",
+                        "instead.",
+                    )
+                ),
+            )
+            csv_dialect = None
+        self.csv_dialect = csv_dialect
+
+        # Delimiters of csv dialects found by csv.Sniffer, and accepted as
+        # csv format, keyed by hash of the sample given to csv.Sniffer.
+        self.csv_delimiters = {}
+
+        # Sheets converted from spreadsheet attachments by ssconvert keyed by
+        # hash of attachment.
+        self._converted_spreadsheets = {}
+
+    def _create_extractor_registry(self):
+        """Return ExtractorRegistry for the content type rules.
+
+        The extractors in this module are registered before those given by
+        entry points.
+
+        """
+        registry = ExtractorRegistry()
+        for extractor in _BUILTIN_EXTRACTORS:
+            registry.register(extractor, extractor.content_types(self))
+        failures = registry.load_entry_points(self)
+        if failures:
+            tkinter.messagebox.showinfo(
+                parent=self.parent,
+                title="Load Extractors",
+                message="".join(
+                    (
+                        "Unable to load extractors:\n\n",
+                        "\n".join(
+                            "".join((name, ": ", str(exc)))
+                            for name, exc in failures
+                        ),
+                        "\n\nThese extractors are not used.",
+                    )
+                ),
+            )
+        return registry
+
+    def __getstate__(self):
+        """Return state for pickling without widgets or selected emails.
+
+        The pickled instance is used by worker processes to extract text.
+
+        """
+        state = self.__dict__.copy()
+        state["parent"] = None
+        state["_selected_emails"] = None
+        state["_selected_emails_text"] = None
+        state["_text_extracted_from_emails"] = None
+        return state
+
+    def pdftotext_reads_stdin(self):
+        """Return True if pdftotext reads PDF documents from stdin.
+
+        The first call gives pdftotext a minimal PDF document on stdin and
+        the answer is used for all later calls.
+
+        """
+        if self._pdftotext_reads_stdin is None:
+            result = self.converter_scheduler.run(
+                (_PDFTOTEXT, "-", "-"),
+                input_=_minimal_pdf(),
+                capture=True,
+            )
+            self._pdftotext_reads_stdin = bool(
+                result.failure is None and result.returncode == 0
+            )
+        return self._pdftotext_reads_stdin
 
     def get_emails(self):
         """Return email files in order stored in mail store.
@@ -744,25 +1415,30 @@ class ExtractEmail:
                 return emails
         try:
             ms = self.mailstore
-            ems = self.emailsender
-            for a in os.listdir(ms):
+            ems = self.sender_matcher
+            listing = _sorted_listing(ms)
+
+            # The filenames start 'yyyymmdd' so the emails in the date range
+            # are a slice of the sorted listing.
+            low = 0
+            high = len(listing)
+            if self.earliestdate is not None:
+                low = bisect.bisect_left(
+                    listing, self.earliestdate.replace("-", "")
+                )
+            if self.mostrecentdate is not None:
+                high = bisect.bisect_left(
+                    listing,
+                    self.mostrecentdate.replace("-", "") + _AFTER_PREFIX,
+                    lo=low,
+                )
+            for i in range(low, high):
+                a = listing[i]
                 if self.ignore:
                     if a in self.ignore:
                         continue
                 if ems:
-                    for e in ems:
-                        # pycodestyle E203 whitespace before ':'.
-                        # black insists on the space.
-                        if e == a[8 : 8 + len(e)]:
-                            break
-                    else:
-                        continue
-                emd = "-".join((a[:4], a[4:6], a[6:8]))
-                if self.earliestdate is not None:
-                    if emd < self.earliestdate:
-                        continue
-                if self.mostrecentdate is not None:
-                    if emd > self.mostrecentdate:
+                    if not ems.match_filename(a):
                         continue
                 emails.append(self._extracttext(a, self))
         except FileNotFoundError:
@@ -784,16 +1460,50 @@ class ExtractEmail:
     def _get_emails_for_from_addressees(self):
         """Return selected email files in order stored in mail store.
 
-        Emails are selected by 'From Adressee' using the email addresses in
-        the emailsender argument of ExtractEmail() call.
+        Emails are selected by 'From Adressee' using the email addresses and
+        patterns in the emailsender argument of ExtractEmail() call.
 
         """
+        emails = self.get_emails()
+        if self.mailstore_index is not None:
+            self._apply_mailstore_index(emails)
         return [
             e
-            for e in self.get_emails()
-            if e.is_from_addressee_in_selection(self.emailsender)
+            for e in emails
+            if e.is_from_addressee_in_selection(self.sender_matcher)
         ]
 
+    def _apply_mailstore_index(self, emails):
+        """Set index entries for emails refreshing index where needed.
+
+        The emails are parsed instead if the index cannot be used.
+
+        """
+        bound = {e.filename: e for e in emails}
+        try:
+            entries = self.mailstore_index.refresh(
+                bound,
+                lambda filename: bound[filename].index_header_values(),
+                listing=_sorted_listing(self.mailstore),
+            )
+        except (MailstoreIndexError, FileNotFoundError) as exc:
+            tkinter.messagebox.showinfo(
+                parent=self.parent,
+                title="Get Emails",
+                message="".join(
+                    (
+                        "Unable to use mailstore index\n\n",
+                        self.mailstore_index.path,
+                        "\n\nbecause\n\n",
+                        str(exc),
+                        "\n\nEmails will be read instead.",
+                    )
+                ),
+            )
+            return
+        for filename, entry in entries.items():
+            bound[filename].index_entry = entry
+
     @property
     def selected_emails(self):
         """Return emails selected by matching requested from addressees."""
@@ -808,6 +1518,174 @@ class ExtractEmail:
             return set()
         return set(self.ignore)
 
+    def convert_spreadsheets(self, emails):
+        """Convert spreadsheet attachments in emails using ssconvert.
+
+        Each distinct spreadsheet is converted once, no matter how many
+        emails it is attached to, and extract_workers conversions are done
+        at the same time.  A spreadsheet attached under filenames with
+        different sheet rules is converted once for each set of rules.
+
+        ssconvert converts one spreadsheet per run so the number of runs is
+        the number of distinct spreadsheets not already converted or in the
+        text cache.
+
+        """
+        if not _SSTOCSV:
+            return
+        cache = self.text_cache
+        jobs = {}
+        for extracttext in emails:
+            for attachment in extracttext.spreadsheet_attachments():
+                extractor, filename, payload = attachment
+                key = self._spreadsheet_key(filename, payload)
+                if key in self._converted_spreadsheets or key in jobs:
+                    continue
+                if (
+                    cache is not None
+                    and extractor.cacheable
+                    and cache.contains(
+                        cache.key(
+                            payload,
+                            extracttext.conversion_options(
+                                extractor, filename
+                            ),
+                        )
+                    )
+                ):
+                    continue
+                jobs[key] = (extracttext, filename, payload)
+        if not jobs:
+            return
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, self.extract_workers or 1)
+        ) as executor:
+            futures = {
+                key: executor.submit(
+                    extracttext.convert_spreadsheet_using_gnumeric,
+                    filename,
+                    payload,
+                )
+                for key, (extracttext, filename, payload) in jobs.items()
+            }
+
+        # The csv files are read in this thread because dialogues may be
+        # shown if a file cannot be read.  A conversion which raised an
+        # exception is reported as a failure when the text is extracted.
+        for key, future in futures.items():
+            try:
+                scratch, result = future.result()
+            except Exception as exc:
+                self._converted_spreadsheets[key] = ConverterResult(
+                    None, error="".join(("could not be run: ", str(exc)))
+                )
+                continue
+            with scratch as dirbase:
+                if result.returncode == 0:
+                    extracttext, filename, payload = jobs[key]
+                    self._converted_spreadsheets[key] = (
+                        extracttext.get_spreadsheet_text(
+                            dirbase, filename=filename
+                        )
+                    )
+                else:
+                    self._converted_spreadsheets[key] = result
+
+    def converted_spreadsheet(self, filename, payload):
+        """Return sheets converted from payload by convert_spreadsheets.
+
+        A ConverterResult means conversion failed and None means payload
+        has not been converted for the sheet rules of filename.
+
+        """
+        if not self._converted_spreadsheets:
+            return None
+        return self._converted_spreadsheets.get(
+            self._spreadsheet_key(filename, payload)
+        )
+
+    def _spreadsheet_key(self, filename, payload):
+        """Return key for sheets converted from payload for filename.
+
+        The key depends on the sheet rules for filename because only the
+        sheets selected by the rules are converted.
+
+        """
+        digest = hashlib.sha256(payload)
+        for rules in self.include_ss_file_sheet, self.exclude_ss_file_sheet:
+            if filename in rules:
+                digest.update(repr(sorted(rules[filename])).encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def extract_text_from_file(self, filename):
+        """Return text extracted from email in filename in mail store."""
+        return self.email_in_file(filename).extracted_text
+
+    def email_in_file(self, filename):
+        """Return ExtractText instance for email in filename in mail store."""
+        return self._extracttext(filename, self)
+
+    def extract_selected_emails(self):
+        """Extract text from selected emails using worker processes.
+
+        The spreadsheet attachments are converted first.
+
+        Nothing else is done unless extract_workers is more than 1, and the
+        extractors for the content type rules are not all cheap and can be
+        used in worker processes.  The text is bound to the ExtractText
+        instances in selected_emails order, and is the text which would be
+        extracted in the application process.
+
+        Text is extracted when first needed, in the application process, if
+        the worker processes cannot be used.  This is done for each email
+        whose extraction in a worker process fails or needs a dialogue: a
+        dialogue cannot be shown by a worker process.
+
+        """
+        emails = [e for e in self.selected_emails if not e.is_text_extracted]
+        self.convert_spreadsheets(emails)
+        if self.extract_workers is None or self.extract_workers < 2:
+            return
+        if len(emails) < 2:
+            return
+        extractors = self.extractors.configured()
+        if not all(e.process_safe for e in extractors):
+            return
+        if all(e.cost == COST_CHEAP for e in extractors):
+            return
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(self.extract_workers, len(emails)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialize_extract_worker,
+                initargs=(self,),
+            ) as executor:
+                futures = [
+                    executor.submit(_extract_text_in_worker, e.filename)
+                    for e in emails
+                ]
+                for extracttext, future in zip(emails, futures):
+                    try:
+                        result = future.result()
+                    except Exception:
+
+                        # The exception, if not caused by the worker process,
+                        # is raised again when the text is extracted in the
+                        # application process.
+                        continue
+                    if result is not None:
+                        (
+                            extracttext.extracted_text,
+                            extracttext.conversion_failures,
+                        ) = result
+        except (
+            concurrent.futures.process.BrokenProcessPool,
+            pickle.PicklingError,
+            TypeError,
+        ):
+            return
+
 
 class ExtractText:
     """Repreresent the stages in processing an email."""
@@ -817,12 +1695,18 @@ class ExtractText:
         self.filename = filename
         self._emailstore = emailstore
         self._message = None
+        self._headers = None
         self._encoded_text = None
+
+        # (attachment filename, reason) for conversions stopped by the
+        # converter scheduler.
+        self.conversion_failures = []
         self._extracted_text = None
         self._edit_differences = None
         self._difference_file_exists = None
         self._date = None
         self._delivery_date = None
+        self.index_entry = None
 
     def __eq__(self, other):
         """Return True if self.filename == other.filename."""
@@ -844,6 +1728,48 @@ class ExtractText:
             self._emailstore.extracts, os.path.splitext(self.filename)[0]
         )
 
+    @property
+    def text_fingerprint(self):
+        """Return sha256 hex digest of text extracted from email.
+
+        The line endings '\r\n' and '\r' are treated as '\n', as when the
+        text is compared with the text in the difference file.
+
+        """
+        text = "\n".join(self.extracted_text)
+        return hashlib.sha256(
+            text.replace("\r\n", "\n")
+            .replace("\r", "\n")
+            .encode("utf-8", errors="surrogatepass")
+        ).hexdigest()
+
+    @property
+    def difference_fingerprint(self):
+        """Return (name, digest, mtime, size) for difference file or None.
+
+        digest is text_fingerprint, and mtime and size are the modification
+        time in nanoseconds and size of the difference file called name.
+        None means there is no difference file.
+
+        (name, digest) is returned if difference records are held in the
+        difference store, where a fingerprint is removed when it's record is
+        replaced.
+
+        """
+        name = os.path.basename(self.difference_file_path)
+        if self._emailstore.difference_store is not None:
+            return name, self.text_fingerprint
+        try:
+            status = os.stat(self.difference_file_path)
+        except FileNotFoundError:
+            return None
+        return (
+            name,
+            self.text_fingerprint,
+            status.st_mtime_ns,
+            status.st_size,
+        )
+
     @property
     def difference_file_exists(self):
         """Return True if difference file existed when edit_differences set.
@@ -855,26 +1781,86 @@ class ExtractText:
         """
         return self._difference_file_exists
 
-    def is_from_addressee_in_selection(self, selection):
-        """Return filename if addressee is in selection.
+    @difference_file_exists.setter
+    def difference_file_exists(self, value):
+        """Set True when difference record is added to difference store."""
+        self._difference_file_exists = value
 
-        The file name is generated by self.message.generate_filename function.
+    @property
+    def difference_record(self):
+        """Return (name, bytes) difference record for the difference store.
+
+        The bytes are those which write_additional_file puts in the
+        difference file.
+
+        """
+        return (
+            os.path.basename(self.difference_file_path),
+            self._difference_data(),
+        )
+
+    def _difference_text(self):
+        """Return edit_differences as str in configured difference format."""
+        if self._emailstore.difference_format == _DELTA_FORMAT:
+            return compact_delta(self.edit_differences)
+        return "".join(self.edit_differences)
+
+    def _difference_data(self):
+        """Return _difference_text encoded utf-8 and compressed if needed."""
+        return compress(
+            self._difference_text().encode("utf8"),
+            self._emailstore.difference_compression,
+        )
+
+    def is_from_addressee_in_selection(self, selection):
+        """Return filename if addressee is in selection.
+
+        The file name is generated by self.headers.generate_filename function.
 
         """
         if selection is None:
             return True
-        from_ = parseaddr(self.message.get("From"))[-1]
+        if self.index_entry is not None:
+            return self._is_indexed_from_addressee_in_selection(selection)
+        from_ = parseaddr(self.headers.get("From"))[-1]
 
         if not selection:
-            return self.message.generate_filename()
+            return self.headers.generate_filename()
 
         # Ignore emails not sent by someone in self.emailsender.
         # Account owners may be in that set, so emails sent from one
         # account owner to another can get selected.
         if from_ in selection:
-            return self.message.generate_filename()
+            return self.headers.generate_filename()
+        return False
+
+    def _is_indexed_from_addressee_in_selection(self, selection):
+        """Return filename if addressee in index entry is in selection."""
+        entry = self.index_entry
+        if not selection or entry.from_address in selection:
+            return entry.generated_filename or False
         return False
 
+    def index_header_values(self):
+        """Return the header values recorded in the mailstore index."""
+        message = self.message
+        return tuple(
+            index_text(v)
+            for v in (
+                parseaddr(message.get("From"))[-1],
+                message.generate_filename() or "",
+                _join_unfolded(message.get_all("date", [])),
+                _join_unfolded(message.get_all("delivery-date", [])),
+                message.get("Subject"),
+                "\n".join(p.get_content_type() for p in message.walk()),
+            )
+        )
+
+    @property
+    def emailstore(self):
+        """Return the ExtractEmail instance whose rules apply to the email."""
+        return self._emailstore
+
     @property
     def message(self):
         """Return object created by email.message_from_binary_file function."""
@@ -893,76 +1879,153 @@ class ExtractText:
                 ]
         return self._message
 
+    @property
+    def headers(self):
+        """Return object created from the headers of the email file.
+
+        The email file is read up to the blank line which ends the headers,
+        so the body and attachments are not read or parsed.  The message
+        is returned if it has been created already.
+
+        """
+        if self._message is not None:
+            return self._message
+        if self._headers is None:
+            with open(self.email_path, "rb") as mf:
+                self._headers = BytesHeaderParser(
+                    _class=MessageFile
+                ).parsebytes(_read_header_block(mf))
+        return self._headers
+
     @property
     def encoded_text(self):
         """Return encoded text extracted from emails."""
         if self._encoded_text is None:
-            text = []
-            for p in self.message.walk():
-                cte = p.get("Content-Transfer-Encoding")
-                if cte:
-                    if cte.lower() == "base64":
-                        t = p.get_payload(decode=True)
-                        if t:
-                            text.append(t)
+            self._encoded_text = list(self.iter_encoded_text())
+        return self._encoded_text
 
-            # If no text at all is extracted return a single blank line.
-            if not text:
-                text.append(b"\n")
+    def iter_encoded_text(self):
+        """Yield decoded base64 parts of email used by the extract rules.
 
-            # Ensure the extracted text ends with a newline so that editing of
-            # the last line causes difflib processing to append the '?   ---\n'
-            # or '?   +++\n' as a separate line in the difference file.
-            # This may make the one character adjustment done by
-            # _insert_entry() in the SourceEdit class redundant.
-            # The reason to not do this all along was to avoid making any
-            # change at all between the selected email payload and the original
-            # version held in the difference file, including an extra newline.
-            # Attempts to wrap difflib functions to cope seem not worth it, if
-            # such prove possible at all.
-            if not text[-1].endswith(b"\n"):
-                text[-1] = b"".join((text[-1], b"\n"))
+        Each part is decoded when the next item is requested, and the
+        decoded parts are not kept, so callers which show or write the
+        parts one at a time do not hold all of them.
 
-            self._encoded_text = text
-        return self._encoded_text
+        """
+        previous = None
+        for p in self.message.walk():
+            cte = p.get("Content-Transfer-Encoding")
+            if not cte or cte.lower() != "base64":
+                continue
+            if not self._is_part_used(p):
+                continue
+            t = p.get_payload(decode=True)
+            if not t:
+                continue
+            if previous is not None:
+                yield previous
+            previous = t
 
-    def _extract_text(
-        self, content_type, filename, payload, text, charset=None
-    ):
-        """Bind text extracted from emails to _emailtore attribute."""
+        # If no text at all is extracted return a single blank line.
+        if previous is None:
+            yield b"\n"
+            return
+
+        # Ensure the extracted text ends with a newline so that editing of
+        # the last line causes difflib processing to append the '?   ---\n'
+        # or '?   +++\n' as a separate line in the difference file.
+        # This may make the one character adjustment done by
+        # _insert_entry() in the SourceEdit class redundant.
+        # The reason to not do this all along was to avoid making any
+        # change at all between the selected email payload and the original
+        # version held in the difference file, including an extra newline.
+        # Attempts to wrap difflib functions to cope seem not worth it, if
+        # such prove possible at all.
+        if not previous.endswith(b"\n"):
+            previous = b"".join((previous, b"\n"))
+        yield previous
+
+    def _is_part_used(self, part):
+        """Return True if text is extracted from part by the extract rules.
+
+        The part's payload is not decoded.
+
+        """
+        ems = self._emailstore
+        ct = part.get_content_type()
+        extractor = ems.extractors.for_content_type(ct)
+        if extractor is None:
+            return ct == "application/ms-tnef" and bool(tnefparse)
+        return extractor.is_selected(ems, part.get_filename())
+
+    def _extract_text(self, extractor, filename, payload, text, charset=None):
+        """Append text converted from payload by extractor to text list.
+
+        The text cache is used, if available, for attachments converted to
+        text by external programs or by parsing XML.
+
+        """
+        cache = self._emailstore.text_cache
+        if cache is None or not extractor.cacheable:
+            self._convert_to_text(
+                extractor, filename, payload, text, charset=charset
+            )
+            return
+        key = cache.key(payload, self.conversion_options(extractor, filename))
+        cached = cache.get(key)
+        if cached is not None:
+            text.append(cached)
+            return
+        converted = []
+        failures = len(self.conversion_failures)
+        self._convert_to_text(
+            extractor, filename, payload, converted, charset=charset
+        )
+        if len(converted) == 1 and failures == len(self.conversion_failures):
+            cache.put(key, converted[0])
+        text.extend(converted)
+
+    def conversion_options(self, extractor, filename):
+        """Return values which affect text converted from an attachment.
+
+        The values are the extractor, the converters available, whether the
+        attachment has a filename, and the sheet selection rules for the
+        filename.
+
+        """
         ems = self._emailstore
-        if content_type == _PDF:
-            if _PDFTOTEXT:
-                self._get_pdf_text_using_xpdf(filename, payload, text)
-            elif pdfminer:
-                self.get_pdf_text_using_pdfminer3k(None, payload, text)
-        elif content_type == _SS:
-            if _SSTOCSV:
-                self._get_ss_text_using_gnumeric(filename, payload, text)
-        elif content_type == _XLSX:
-            if _SSTOCSV:
-                self._get_ss_text_using_gnumeric(filename, payload, text)
-            elif xlsx2csv:
-                self._get_ss_text_using_xlsx2csv(filename, payload, text)
-        elif content_type == _ODS:
-            if _SSTOCSV:
-                self._get_ss_text_using_gnumeric(filename, payload, text)
+        options = [
+            _CONVERTER_VERSION,
+            extractor.kind,
+            extractor.name,
+            extractor.version,
+            _PDFTOTEXT,
+            bool(pdfminer),
+            _SSTOCSV,
+            bool(xlsx2csv),
+            bool(filename),
+            ems.zip_member_size_limit,
+            ems.xlsx_extractor,
+            ems.pdfminer_engine.pages,
+            ems.pdfminer_engine.max_pages,
+            ems.csv_sniff_sample,
+            ems.csv_dialect,
+        ]
+        for rules in ems.include_ss_file_sheet, ems.exclude_ss_file_sheet:
+            options.append(bool(rules))
+            if filename in rules:
+                options.append(sorted(rules[filename]))
             else:
-                self._get_ods_text_using_python_xml(filename, payload, text)
-        elif content_type == _CSV:
-            if ems.include_csv_file:
-                if filename not in ems.include_csv_file:
-                    return
-            elif ems.exclude_csv_file:
-                if filename in ems.exclude_csv_file:
-                    return
-            text.append(self.get_csv_text(payload, charset))
-        elif content_type == _TXT:
-            text.append(payload.decode(charset))
-        elif content_type == _DOCX:
-            text.append(self.get_docx_text(payload, ems.eventdirectory))
-        elif content_type == _ODT:
-            text.append(self.get_odt_text(payload, ems.eventdirectory))
+                options.append(None)
+        return tuple(options)
+
+    def _convert_to_text(
+        self, extractor, filename, payload, text, charset=None
+    ):
+        """Append text converted from payload by extractor to text list."""
+        if not extractor.is_available(self._emailstore):
+            return
+        extractor.extract(self, filename, payload, text, charset=charset)
 
     @property
     def extracted_text(self):
@@ -972,60 +2035,24 @@ class ExtractText:
             text = []
             for p in self.message.walk():
                 ct = p.get_content_type()
-                if ct in ems.pdf_content_type:
-                    self._extract_text(
-                        _PDF,
-                        p.get_filename(),
-                        p.get_payload(decode=True),
-                        text,
-                    )
-                elif ct in ems.ss_content_type:
-                    self._extract_text(
-                        _SS, p.get_filename(), p.get_payload(decode=True), text
-                    )
-                elif ct in ems.xlsx_content_type:
-                    self._extract_text(
-                        _XLSX,
-                        p.get_filename(),
-                        p.get_payload(decode=True),
-                        text,
-                    )
-                elif ct in ems.ods_content_type:
-                    self._extract_text(
-                        _ODS,
-                        p.get_filename(),
-                        p.get_payload(decode=True),
-                        text,
-                    )
-                elif ct in ems.csv_content_type:
-                    self._extract_text(
-                        _CSV,
-                        p.get_filename(),
-                        p.get_payload(decode=True),
-                        text,
-                        charset=p.get_param("charset", failobj="utf-8"),
-                    )
-                elif ct in ems.text_content_type:
-                    self._extract_text(
-                        _TXT,
-                        p.get_filename(),
-                        p.get_payload(decode=True),
-                        text,
-                        charset=p.get_param("charset", failobj="iso-8859-1"),
-                    )
-                elif ct in ems.docx_content_type:
-                    self._extract_text(
-                        _DOCX,
-                        p.get_filename(),
-                        p.get_payload(decode=True),
-                        text,
-                    )
-                elif ct in ems.odt_content_type:
+                extractor = ems.extractors.for_content_type(ct)
+                if extractor is not None:
+                    if not extractor.is_available(ems):
+                        continue
+                    if not extractor.is_selected(ems, p.get_filename()):
+                        continue
+                    if extractor.default_charset is None:
+                        charset = None
+                    else:
+                        charset = p.get_param(
+                            "charset", failobj=extractor.default_charset
+                        )
                     self._extract_text(
-                        _ODT,
+                        extractor,
                         p.get_filename(),
                         p.get_payload(decode=True),
                         text,
+                        charset=charset,
                     )
                 elif ct == "application/ms-tnef":
                     if not tnefparse:
@@ -1052,16 +2079,15 @@ class ExtractText:
                     tnef = tnefparse.TNEF(base64.b64decode(p.get_payload()))
                     for attachment in tnef.attachments:
                         name = attachment.name
-                        for e in _PDF, _XLSX, _ODS, _CSV, _TXT, _DOCX, _ODT:
-                            if name.lower().endswith(e):
-                                self._extract_text(
-                                    e,
-                                    attachment.name,
-                                    attachment.data,
-                                    text,
-                                    charset="iso-8859-1",
-                                )
-                                break
+                        extractor = ems.extractors.for_filename(name)
+                        if extractor is not None:
+                            self._extract_text(
+                                extractor,
+                                attachment.name,
+                                attachment.data,
+                                text,
+                                charset="iso-8859-1",
+                            )
                         else:
                             text.append(
                                 "".join(
@@ -1094,15 +2120,21 @@ class ExtractText:
             self._extracted_text = text
         return self._extracted_text
 
+    @extracted_text.setter
+    def extracted_text(self, value):
+        """Set text extracted from email, usually by a worker process."""
+        self._extracted_text = value
+
+    @property
+    def is_text_extracted(self):
+        """Return True if text has been extracted from email."""
+        return self._extracted_text is not None
+
     def _is_attachment_to_be_extracted(self, attachment_filename):
-        ems = self._emailstore
-        if ems.include_ss_file_sheet:
-            if attachment_filename not in ems.include_ss_file_sheet:
-                return None
-        elif ems.exclude_ss_file_sheet:
-            if attachment_filename in ems.exclude_ss_file_sheet:
-                return None
+        if not _is_spreadsheet_selected(self._emailstore, attachment_filename):
+            return None
         if _decode_header(attachment_filename) is None:
+            _refuse_dialogue_in_worker()
             tkinter.messagebox.showinfo(
                 parent=self._emailstore.parent,
                 title="Extract Spreadsheet Data",
@@ -1121,133 +2153,307 @@ class ExtractText:
             op.write(payload)
         return a
 
-    def _get_ss_text_using_gnumeric(self, filename, payload, text):
-        fn = filename
-        if not self._is_attachment_to_be_extracted(fn):
-            return
+    def _report_conversion_failure(self, filename, program, failure, text):
+        """Append note that program did not convert attachment to text."""
+        self.conversion_failures.append((filename, failure))
+        text.append(
+            "".join(
+                (
+                    "Cannot process '",
+                    str(filename),
+                    "': ",
+                    os.path.basename(program),
+                    " ",
+                    failure,
+                    ".",
+                )
+            )
+        )
+
+    def _zip_members(self, payload, select):
+        """Yield (name, file) for members of zip archive payload.
+
+        Only members whose names are accepted by select(name) are opened,
+        one at a time, and the file is readable until the next member is
+        yielded.  ZipMemberSizeError is raised for a member longer than
+        zip_member_size_limit when decompressed.
+
+        """
+        with zipfile.ZipFile(io.BytesIO(payload)) as xmlzip:
+            for info in xmlzip.infolist():
+                if not select(info.filename):
+                    continue
+                with self._open_zip_member(xmlzip, info) as f:
+                    yield info.filename, f
+
+    def _open_zip_member(self, xmlzip, info):
+        """Return reader for member info of xmlzip limited to member size.
+
+        ZipMemberSizeError is raised, when opened or when read, for a member
+        longer than zip_member_size_limit when decompressed.
+
+        """
+        limit = self._emailstore.zip_member_size_limit
+        if isinstance(info, str):
+            info = xmlzip.getinfo(info)
+        if info.file_size > limit:
+            raise _zip_member_size_error(info.filename, limit)
+
+        # The file_size in the archive may be false so the number of bytes
+        # read is limited too.
+        return _SizeLimitedReader(xmlzip.open(info), info.filename, limit)
+
+    def _scratch_directory(self):
+        """Return private temporary directory for converting an attachment.
+
+        The directory and it's contents are deleted on exit from the context
+        manager returned.
+
+        """
+        return tempfile.TemporaryDirectory(
+            prefix="emailextract-", dir=self._emailstore.scratch_directory
+        )
+
+    def spreadsheet_attachments(self):
+        """Return (extractor, filename, payload) for attachments to ssconvert.
+
+        Attachments whose sheets are all excluded by the sheet rules, and
+        attachments without a filename, are not included.  Attachments in
+        application/ms-tnef attachments are not included.
+
+        """
+        ems = self._emailstore
+        attachments = []
+        for p in self.message.walk():
+            extractor = ems.extractors.for_content_type(p.get_content_type())
+            if extractor is None or extractor.kind not in _SSCONVERT_KINDS:
+                continue
+            if extractor.kind == _XLSX and ems.xlsx_extractor == _NATIVE_XLSX:
+                continue
+            filename = p.get_filename()
+            if filename is None:
+                continue
+            if not extractor.is_selected(ems, filename):
+                continue
+            attachments.append(
+                (extractor, filename, p.get_payload(decode=True))
+            )
+        return attachments
+
+    def convert_spreadsheet_using_gnumeric(self, filename, payload):
+        """Return (scratch directory, ConverterResult) from ssconvert run.
+
+        The sheets are csv files in the xls-attachments directory in the
+        scratch directory, which is deleted on exit from it's context.
+
+        Just the sheets named by the include_ss_file_sheet rule for filename,
+        if there is one, are converted.  All sheets are converted if none of
+        the named sheets is converted.
+
+        """
         ems = self._emailstore
+        scratch = self._scratch_directory()
         taf = self._create_temporary_attachment_file(
-            filename, payload, ems.eventdirectory
+            filename, payload, scratch.name
         )
-        with subprocess.Popen(
-            (_SSTOCSV, "--recalc", "-S", taf, "%s.csv"),
-            cwd=os.path.join(ems.eventdirectory, "xls-attachments"),
-        ) as process:
-            pass
-        if process.returncode == 0:
-            sstext = []
-            for sheet, sheettext in self.get_spreadsheet_text(
-                ems.eventdirectory
-            ):
-                if fn in ems.include_ss_file_sheet:
-                    if ems.include_ss_file_sheet[fn]:
-                        if sheet not in ems.include_ss_file_sheet[fn]:
-                            continue
-                elif fn in ems.exclude_ss_file_sheet:
-                    if ems.exclude_ss_file_sheet[fn]:
-                        if sheet in ems.exclude_ss_file_sheet[fn]:
-                            continue
-                    else:
-                        continue
-                sstext.append(sheettext)
-            text.append("\n\n".join(sstext))
-        shutil.rmtree(
-            os.path.join(ems.eventdirectory, "xls-attachments"),
-            ignore_errors=True,
+        cwd = os.path.join(scratch.name, "xls-attachments")
+        if filename in ems.include_ss_file_sheet:
+            if ems.include_ss_file_sheet[filename]:
+                result = ems.converter_scheduler.run(
+                    (
+                        _SSTOCSV,
+                        "--recalc",
+                        "-S",
+                        "-O",
+                        _ssconvert_sheet_options(
+                            ems.include_ss_file_sheet[filename]
+                        ),
+                        taf,
+                        "%s.csv",
+                    ),
+                    cwd=cwd,
+                )
+                if result.failure:
+                    return scratch, result
+                csvfiles = [
+                    fn
+                    for fn in os.listdir(cwd)
+                    if os.path.splitext(fn)[1].lower() == ".csv"
+                ]
+                if result.returncode == 0 and csvfiles:
+                    return scratch, result
+                for fn in csvfiles:
+                    os.remove(os.path.join(cwd, fn))
+        result = ems.converter_scheduler.run(
+            (_SSTOCSV, "--recalc", "-S", taf, "%s.csv"), cwd=cwd
         )
+        return scratch, result
 
-    def _get_ss_text_using_xlsx2csv(self, filename, payload, text):
+    def get_ss_text_using_gnumeric(self, filename, payload, text):
+        """Append text converted from spreadsheet by ssconvert to text."""
         fn = filename
         if not self._is_attachment_to_be_extracted(fn):
             return
-        ems = self._emailstore
-        taf = os.path.join(
-            ems.eventdirectory,
-            "xls-attachments",
-            self._create_temporary_attachment_file(
-                filename, payload, ems.eventdirectory
-            ),
-        )
+        sheets = self._emailstore.converted_spreadsheet(fn, payload)
+        if sheets is None:
+            scratch, sheets = self.convert_spreadsheet_using_gnumeric(
+                filename, payload
+            )
+            with scratch as dirbase:
+                if sheets.returncode == 0:
+                    sheets = self.get_spreadsheet_text(dirbase, filename=fn)
+        if isinstance(sheets, ConverterResult):
+            if sheets.failure:
+                self._report_conversion_failure(
+                    fn, _SSTOCSV, sheets.failure, text
+                )
+            return
+        text.append("\n\n".join(sheettext for sheet, sheettext in sheets))
 
-        # Extract all sheets and filter afterwards.
-        # xlsx2csv can do the filtering and will be used to do so later.
-        # outputencoding has to be given, even though it is default value, to
-        # avoid a KeyError exception on options passed to Xlsx2csv in Python 3.
-        # The defaults of other arguments are used as expected.
-        xlsx2csv.Xlsx2csv(
-            taf,
-            skip_empty_lines=True,
-            sheetid=0,
-            dateformat="%Y-%m-%d",
-            outputencoding="utf-8",
-        ).convert(
-            os.path.join(ems.eventdirectory, "xls-attachments"), sheetid=0
-        )
+    def get_ss_text_using_xlsx2csv(self, filename, payload, text):
+        """Append text converted from xlsx spreadsheet by xlsx2csv to text."""
+        fn = filename
+        if not self._is_attachment_to_be_extracted(fn):
+            return
+        with self._scratch_directory() as dirbase:
+            taf = os.path.join(
+                dirbase,
+                "xls-attachments",
+                self._create_temporary_attachment_file(
+                    filename, payload, dirbase
+                ),
+            )
+
+            # Convert just the sheets selected by the sheet rules.
+            # outputencoding has to be given, even though it is default value,
+            # to avoid a KeyError exception on options passed to Xlsx2csv in
+            # Python 3.
+            # The defaults of other arguments are used as expected.
+            workbook = xlsx2csv.Xlsx2csv(
+                taf,
+                skip_empty_lines=True,
+                sheetid=0,
+                dateformat="%Y-%m-%d",
+                outputencoding="utf-8",
+            )
+            for sheet in workbook.workbook.sheets:
+                if not self._is_sheet_to_be_extracted(
+                    fn, sheet["name"].lower()
+                ):
+                    continue
+                workbook.convert(
+                    os.path.join(
+                        dirbase, "xls-attachments", sheet["name"] + ".csv"
+                    ),
+                    sheetid=sheet.get("index", sheet.get("id")),
+                )
+            sheets = self.get_spreadsheet_text(dirbase, filename=fn)
+        text.append("\n\n".join(sheettext for sheet, sheettext in sheets))
+
+    def get_xlsx_text_using_python_xml(self, filename, payload, text):
+        """Append text from sheets of xlsx workbook payload.
 
+        The sheets excluded by the sheet rules are not read.  The text is
+        the text extracted by xlsx2csv.
+
+        """
+        fn = filename
+        if not self._is_attachment_to_be_extracted(fn):
+            return
         sstext = []
-        for sheet, sheettext in self.get_spreadsheet_text(ems.eventdirectory):
-            if fn in ems.include_ss_file_sheet:
-                if ems.include_ss_file_sheet[fn]:
-                    if sheet not in ems.include_ss_file_sheet[fn]:
+        try:
+            with zipfile.ZipFile(io.BytesIO(payload)) as xmlzip:
+                workbook = XlsxWorkbook(
+                    xmlzip.namelist(),
+                    lambda name: self._open_zip_member(xmlzip, name),
+                )
+                for sheet, _ in workbook.sheets:
+                    sheetname = sheet.lower()
+                    if not self._is_sheet_to_be_extracted(fn, sheetname):
                         continue
-            elif fn in ems.exclude_ss_file_sheet:
-                if ems.exclude_ss_file_sheet[fn]:
-                    if sheet in ems.exclude_ss_file_sheet[fn]:
+                    csvtext = workbook.sheet_csv(sheet)
+                    if csvtext is None:
                         continue
-                else:
-                    continue
-            sstext.append(sheettext)
+                    sheettext = self._get_sheet_text(
+                        io.StringIO(csvtext), sheetname, sheet
+                    )
+                    if sheettext is not None:
+                        sstext.append(sheettext)
+        except ZipMemberSizeError as exc:
+            text.append(
+                "".join(("Cannot process '", str(fn), "': ", str(exc)))
+            )
+            return
         text.append("\n\n".join(sstext))
-        shutil.rmtree(
-            os.path.join(ems.eventdirectory, "xls-attachments"),
-            ignore_errors=True,
-        )
 
-    def _get_ods_text_using_python_xml(self, filename, payload, text):
+    def _is_sheet_to_be_extracted(self, filename, sheet):
+        """Return True if sheet in filename is selected by the sheet rules.
+
+        All sheets are selected if filename is None.
+
+        """
+        ems = self._emailstore
+        if filename in ems.include_ss_file_sheet:
+            if ems.include_ss_file_sheet[filename]:
+                if sheet not in ems.include_ss_file_sheet[filename]:
+                    return False
+        elif filename in ems.exclude_ss_file_sheet:
+            if ems.exclude_ss_file_sheet[filename]:
+                if sheet in ems.exclude_ss_file_sheet[filename]:
+                    return False
+            else:
+                return False
+        return True
+
+    def get_ods_text_using_python_xml(self, filename, payload, text):
+        """Append text read from ods spreadsheet by xml functions to text."""
         nstable = "{urn:oasis:names:tc:opendocument:xmlns:table:1.0}"
         nstext = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
         nsoffice = "{urn:oasis:names:tc:opendocument:xmlns:office:1.0}"
 
-        def get_rows(table):
-            rows = []
-            for row in table.iter(nstable + "table-row"):
-                rows.append({})
-                cells = rows[-1]
-                for cell in row.iter(nstable + "table-cell"):
-                    repeat = int(
-                        cell.attrib.get(
-                            nstable + "number-columns-repeated", "1"
-                        )
-                    )
-                    if cell.attrib.get(nsoffice + "value-type") == "date":
-                        paragraphs = [cell.attrib[nsoffice + "date-value"]]
-                    else:
-                        paragraphs = []
-                        for element in cell.iter(nstext + "p"):
-                            if element.text is not None:
-                                paragraphs.append(element.text)
-                    text = "\n\n".join(paragraphs)
-                    for r in range(repeat):
-                        cells[len(cells)] = text if paragraphs else None
-
-            # Discard leading and trailing empty columns, and empty rows.
-            # No need to convert remaining Nones to ''s because csv module
-            # DictWriter.writerows() method does it.
-            trailing = -1
-            leading = max(len(r) for r in rows)
-            for r in rows:
-                notnone = sorted(k for k, v in r.items() if v is not None)
-                if notnone:
-                    trailing = max(notnone[-1], trailing)
-                    leading = min(notnone[0], leading)
-            for r in rows:
-                columns = list(r.keys())
-                for c in columns:
-                    if c > trailing or c < leading:
-                        del r[c]
-            return [
-                r for r in rows if [v for v in r.values() if v is not None]
-            ]
+        def get_row(row):
+            # Return the runs of non-empty cells in row as (column, repeat,
+            # text) tuples, and the number of times the row is repeated.
+            # Spreadsheet applications write empty cells at the end of a row
+            # with repeat counts like 1024 so empty cells are counted but not
+            # held.
+            runs = []
+            column = 0
+            for cell in row.iter(nstable + "table-cell"):
+                repeat = int(
+                    cell.attrib.get(nstable + "number-columns-repeated", "1")
+                )
+                if cell.attrib.get(nsoffice + "value-type") == "date":
+                    paragraphs = [cell.attrib[nsoffice + "date-value"]]
+                else:
+                    paragraphs = []
+                    for element in cell.iter(nstext + "p"):
+                        if element.text is not None:
+                            paragraphs.append(element.text)
+                if paragraphs:
+                    runs.append((column, repeat, "\n\n".join(paragraphs)))
+                column += repeat
+            return runs, int(
+                row.attrib.get(nstable + "number-rows-repeated", "1")
+            )
+
+        def get_rows(rows):
+            # Discard leading and trailing empty columns, and empty rows,
+            # before expanding the runs of cells.  Repeated empty rows are
+            # never expanded.
+            rows = [r for r in rows if r[0]]
+            if not rows:
+                return rows
+            leading = min(runs[0][0] for runs, repeat in rows)
+            trailing = max(runs[-1][0] + runs[-1][1] for runs, repeat in rows)
+            expanded = []
+            for runs, repeat in rows:
+                cells = [""] * (trailing - leading)
+                for column, count, text in runs:
+                    column -= leading
+                    cells[column : column + count] = [text] * count
+                expanded.extend([cells] * repeat)
+            return expanded
 
         ems = self._emailstore
         fn = filename
@@ -1257,44 +2463,62 @@ class ExtractText:
         elif ems.exclude_ss_file_sheet:
             if fn in ems.exclude_ss_file_sheet:
                 return
-        archive = {}
-        with zipfile.ZipFile(io.BytesIO(payload)) as xmlzip:
-            for n in xmlzip.namelist():
-                with xmlzip.open(n) as f:
-                    archive[n] = f.read()
-        for k, v in archive.items():
-            if os.path.basename(k) == "content.xml":
-                tree = xml.etree.ElementTree.XML(v)
+        membertext = []
+        try:
+            for _, v in self._zip_members(
+                payload, lambda n: os.path.basename(n) == "content.xml"
+            ):
                 sstext = []
-                for spreadsheet in tree.iter(nsoffice + "spreadsheet"):
-                    for table in spreadsheet.iter(nstable + "table"):
-                        sheet = table.attrib[nstable + "name"]
+                spreadsheets = 0
+                rows = None
+                for event, element in iterrecords(
+                    v,
+                    {nstable + "table-row"},
+                    boundaries={nsoffice + "spreadsheet", nstable + "table"},
+                ):
+                    if element.tag == nsoffice + "spreadsheet":
+                        spreadsheets += 1 if event == "start" else -1
+                    elif not spreadsheets:
+                        continue
+                    elif event == "record":
+                        if rows is not None:
+                            rows.append(get_row(element))
+                    elif event == "start":
+                        sheet = element.attrib[nstable + "name"]
+                        rows = []
                         if fn in ems.include_ss_file_sheet:
                             if ems.include_ss_file_sheet[fn]:
                                 if sheet not in ems.include_ss_file_sheet[fn]:
-                                    continue
+                                    rows = None
                         elif fn in ems.exclude_ss_file_sheet:
                             if ems.exclude_ss_file_sheet[fn]:
                                 if sheet in ems.exclude_ss_file_sheet[fn]:
-                                    continue
+                                    rows = None
                             else:
-                                continue
-                        rows = get_rows(table)
-                        if not rows:
-                            continue
-                        fieldnames = sorted(rows[0].keys())
-                        csvfile = io.StringIO()
-                        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                        writer.writerows(rows)
-                        try:
+                                rows = None
+                    elif rows is not None:
+                        rows = get_rows(rows)
+                        if rows:
                             sstext.append(
-                                self.extract_text_from_csv(
-                                    csvfile, sheet=sheet
-                                )
+                                self._get_ods_sheet_text(rows, sheet)
                             )
-                        except KeyError as exc:
-                            raise EmailExtractorError from exc
-                text.append("\n\n".join(sstext))
+                        rows = None
+                membertext.append("\n\n".join(sstext))
+        except ZipMemberSizeError as exc:
+            text.append(
+                "".join(("Cannot process '", str(fn), "': ", str(exc)))
+            )
+            return
+        text.extend(membertext)
+
+    def _get_ods_sheet_text(self, rows, sheet):
+        """Return text from rows of cells from sheet in an ods attachment."""
+        csvfile = io.StringIO()
+        csv.writer(csvfile).writerows(rows)
+        try:
+            return self.extract_text_from_csv(csvfile, sheet=sheet)
+        except KeyError as exc:
+            raise EmailExtractorError from exc
 
     def get_docx_text(self, payload, dirbase):
         """Return text from payload, an Office Open XML email attachment.
@@ -1309,21 +2533,22 @@ class ExtractText:
         del dirbase
         nsb = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
 
-        archive = {}
-        with zipfile.ZipFile(io.BytesIO(payload)) as xmlzip:
-            for n in xmlzip.namelist():
-                with xmlzip.open(n) as f:
-                    archive[n] = f.read()
         text = []
-        for k, v in archive.items():
-            if os.path.basename((os.path.splitext(k)[0])) == "document":
+        try:
+            for _, v in self._zip_members(
+                payload,
+                lambda n: os.path.basename(os.path.splitext(n)[0])
+                == "document",
+            ):
                 paragraphs = []
-                tree = xml.etree.ElementTree.XML(v)
-                for p in tree.iter(nsb + "p"):
-                    t = [n.text for n in p.iter(nsb + "t") if n.text]
-                    if t:
-                        paragraphs.append("".join(t))
+                for _, record in iterrecords(v, {nsb + "p"}):
+                    for p in record.iter(nsb + "p"):
+                        t = [n.text for n in p.iter(nsb + "t") if n.text]
+                        if t:
+                            paragraphs.append("".join(t))
                 text.append("\n\n".join(paragraphs))
+        except ZipMemberSizeError as exc:
+            return "".join(("Cannot process attachment: ", str(exc)))
         return "\n".join(text)
 
     def get_odt_text(self, payload, dirbase):
@@ -1360,60 +2585,98 @@ class ExtractText:
                 text.append(element.tail)
             return "".join(text)
 
-        archive = {}
-        with zipfile.ZipFile(io.BytesIO(payload)) as xmlzip:
-            for n in xmlzip.namelist():
-                with xmlzip.open(n) as f:
-                    archive[n] = f.read()
         text = []
-        for k, v in archive.items():
-            if os.path.basename((os.path.splitext(k)[0])) == "content":
-                for child in xml.etree.ElementTree.fromstring(v).iter():
-                    if child.tag in topelems:
-                        text.append(get_text(child))
+        try:
+            for _, v in self._zip_members(
+                payload,
+                lambda n: os.path.basename(os.path.splitext(n)[0])
+                == "content",
+            ):
+                for _, record in iterrecords(v, topelems):
+                    for child in record.iter():
+                        if child.tag in topelems:
+                            text.append(get_text(child))
+        except ZipMemberSizeError as exc:
+            return "".join(("Cannot process attachment: ", str(exc)))
         return "\n".join(text)
 
-    def _get_pdf_text_using_xpdf(self, filename, payload, text):
+    def get_pdf_text_using_xpdf(self, filename, payload, text):
         """Use pdf2text utility (part of xpdf) to extract text."""
         a = _decode_header(filename)
-        aout = a + ".txt"
         if a is None:
+            _refuse_dialogue_in_worker()
             tkinter.messagebox.showinfo(
                 parent=self._emailstore.parent,
                 title="Extract PDF Data",
                 message="PDF attachment does not have a filename.",
             )
             return ""
-        dirbase = self._emailstore.eventdirectory
-        try:
-            os.mkdir(os.path.join(dirbase, "pdf-attachments"))
-        except FileExistsError:
-            pass
-        with open(os.path.join(dirbase, "pdf-attachments", a), "wb") as op:
-            op.write(payload)
-        with subprocess.Popen(
+        aout = a + ".txt"
+        if not self._emailstore.pdftotext_reads_stdin():
+            self._get_pdf_text_using_xpdf_files(a, aout, payload, text)
+            return None
+        result = self._get_pdf_text_using_xpdf_pipe(payload)
+        if result.failure:
+            self._report_conversion_failure(
+                a, _PDFTOTEXT, result.failure, text
+            )
+        elif result.returncode == 0:
+
+            # Decode as a file opened in text mode would be read.
+            text.append(
+                io.TextIOWrapper(
+                    io.BytesIO(result.stdout), encoding="iso-8859-1"
+                ).read()
+            )
+        return None
+
+    def _get_pdf_text_using_xpdf_pipe(self, payload):
+        """Return ConverterResult from pdftotext given payload on stdin."""
+        return self._emailstore.converter_scheduler.run(
             (
                 _PDFTOTEXT,
                 "-nopgbrk",  # no way of saying this in pdfminer3k.
                 "-layout",
-                a,
-                aout,
+                "-",
+                "-",
             ),
-            cwd=os.path.join(dirbase, "pdf-attachments"),
-        ) as process:
-            pass
-        if process.returncode == 0:
-            if os.path.exists(os.path.join(dirbase, "pdf-attachments", aout)):
-                with open(
-                    os.path.join(dirbase, "pdf-attachments", aout),
-                    "r",
-                    encoding="iso-8859-1",
-                ) as op:
-                    text.append(op.read())
-        shutil.rmtree(
-            os.path.join(dirbase, "pdf-attachments"), ignore_errors=True
+            input_=payload,
+            capture=True,
         )
-        return None
+
+    def _get_pdf_text_using_xpdf_files(self, a, aout, payload, text):
+        """Append text from pdftotext using files and return True if done."""
+        with self._scratch_directory() as dirbase:
+            os.mkdir(os.path.join(dirbase, "pdf-attachments"))
+            with open(os.path.join(dirbase, "pdf-attachments", a), "wb") as op:
+                op.write(payload)
+            result = self._emailstore.converter_scheduler.run(
+                (
+                    _PDFTOTEXT,
+                    "-nopgbrk",  # no way of saying this in pdfminer3k.
+                    "-layout",
+                    a,
+                    aout,
+                ),
+                cwd=os.path.join(dirbase, "pdf-attachments"),
+            )
+            if result.failure:
+                self._report_conversion_failure(
+                    a, _PDFTOTEXT, result.failure, text
+                )
+                return False
+            if result.returncode == 0:
+                if os.path.exists(
+                    os.path.join(dirbase, "pdf-attachments", aout)
+                ):
+                    with open(
+                        os.path.join(dirbase, "pdf-attachments", aout),
+                        "r",
+                        encoding="iso-8859-1",
+                    ) as op:
+                        text.append(op.read())
+                    return True
+        return False
 
     def get_pdf_text_using_pdfminer3k(
         self, filename, payload, text, char_margin=150, word_margin=1, **k
@@ -1449,50 +2712,31 @@ class ExtractText:
         paragraph_indent=None
         heuristic_word_margin=False
 
+        The pdfminer_engine of the ExtractEmail instance reads the pages
+        selected by it's page limits, and a note is appended to text if the
+        time limit stops reading.
+
         """
-        # Adapted from pdf2txt.py script included in pdfminer3k-1.3.1.
-        # On some *.pdf inputs the script raises UnicodeEncodeError:
-        # 'ascii' codec can't encode character ...
-        # which does not happen with the adaption below.
-        # A sample ... is '\u2019 in position 0: ordinal not in range(128)'.
-        # Changing 'outfp = io.open(...)' to 'outfp = open(...)' was sufficient
-        # but here it is most convenient to say 'outfp = io.StringIO()'.
-        del filename
-        caching = True
-        rsrcmgr = pdfinterp.PDFResourceManager(caching=caching)
-        laparams = layout.LAParams(
-            char_margin=char_margin, word_margin=word_margin
+        engine = self._emailstore.pdfminer_engine
+        pdftext, failure = engine.extract(
+            payload,
+            engine.layout(
+                char_margin=char_margin, word_margin=word_margin, **k
+            ),
         )
-        for a in laparams.__dict__:
-            if a in k:
-                laparams.__dict__[a] = k[a]
-        outfp = io.StringIO()
-        device = converter.TextConverter(rsrcmgr, outfp, laparams=laparams)
-        try:
-            fp = io.BytesIO(payload)
-            try:
-                pdfinterp.process_pdf(
-                    rsrcmgr,
-                    device,
-                    fp,
-                    pagenos=set(),
-                    maxpages=0,
-                    password="",
-                    caching=caching,
-                    check_extractable=True,
-                )
-            finally:
-                fp.close()
-        finally:
-            device.close()
-        text.append(outfp.getvalue())
-        outfp.close()
-
-    def get_spreadsheet_text(self, dirbase):
+        text.append(pdftext)
+        if failure:
+            self._report_conversion_failure(
+                filename, "pdfminer3k", failure, text
+            )
+
+    def get_spreadsheet_text(self, dirbase, filename=None):
         """Return (sheetname, text) from spreadsheet attachment part.
 
-        dirbase is the event directory where a temporary directory is created
-        to hold temporary files for the attachment extracts.
+        dirbase is the private temporary directory containing the
+        xls-attachments directory which holds the attachment extracts.
+        Sheets not selected by the sheet rules for filename are ignored
+        without being read.
         """
         text = []
         for fn in os.listdir(os.path.join(dirbase, "xls-attachments")):
@@ -1500,46 +2744,72 @@ class ExtractText:
             if e.lower() != ".csv":
                 continue
             sheetname = sheetname.lower()
+            if not self._is_sheet_to_be_extracted(filename, sheetname):
+                continue
             csvp = os.path.join(dirbase, "xls-attachments", fn)
             if not os.path.exists(csvp):
                 continue
-            try:
-                text.append(
+            sheettext = self._get_sheet_text(
+                self._read_file(csvp), sheetname, os.path.splitext(fn)[0]
+            )
+            if sheettext is not None:
+                text.append((sheetname, sheettext))
+        return text
+
+    def _get_sheet_text(self, csvfile, sheetname, title):
+        """Return text from csvfile for sheet or None if not csv format.
+
+        title is the name of the sheet shown in the dialogue if the csv
+        module cannot handle the text.
+
+        """
+        try:
+            return self.extract_text_from_csv(csvfile, sheet=sheetname)
+        except KeyError as exc:
+            raise EmailExtractorError from exc
+        except csv.Error as exc:
+            _refuse_dialogue_in_worker()
+            tkinter.messagebox.showinfo(
+                parent=self._emailstore.parent,
+                title="Extract Text from CSV",
+                message="".join(
                     (
-                        sheetname,
-                        self.extract_text_from_csv(
-                            self._read_file(csvp), sheet=sheetname
-                        ),
+                        str(exc),
+                        "\n\nreported by csv module for sheet\n\n",
+                        title,
+                        "\n\nwhich is not included in extracted text.",
                     )
-                )
-            except KeyError as exc:
-                raise EmailExtractorError from exc
-            except csv.Error as exc:
-                tkinter.messagebox.showinfo(
-                    parent=self._emailstore.parent,
-                    title="Extract Text from CSV",
-                    message="".join(
-                        (
-                            str(exc),
-                            "\n\nreported by csv module for sheet\n\n",
-                            os.path.splitext(fn)[0],
-                            "\n\nwhich is not included in extracted text.",
-                        )
-                    ),
-                )
-        return text
+                ),
+            )
+        return None
 
     def extract_text_from_csv(self, text, sheet=None, filename=None):
         """Return text if it looks like CSV format, otherwise ''.
 
         A csv.Sniffer determines the csv dialect and text is accepted as csv
-        format if the delimeiter seems to be in ',/t;:'.
+        format if the delimiter seems to be comma, tab, semicolon, or colon.
+
+        The csv.Sniffer is given the first csv_sniff_sample characters of
+        text.  An accepted delimiter is remembered for the sample, so
+        csv.Sniffer is not used again for text with the same sample: the
+        result is the same whatever order text is processed.  The text is
+        accepted without using csv.Sniffer if csv_dialect is given: the
+        dialect is not used otherwise because text is returned unchanged.
         """
         del sheet, filename
+        ems = self._emailstore
         text = text.getvalue()
-        dialect = csv.Sniffer().sniff(text)
-        if dialect.delimiter not in ",/t;:":
-            return ""
+        if ems.csv_dialect is not None:
+            return text
+        sample = _csv_sniff_sample(text, ems.csv_sniff_sample)
+        key = hashlib.sha256(
+            sample.encode("utf-8", errors="surrogatepass")
+        ).digest()
+        if key not in ems.csv_delimiters:
+            delimiter = csv.Sniffer().sniff(sample).delimiter
+            if delimiter not in ",\t;:":
+                return ""
+            ems.csv_delimiters[key] = delimiter
 
         # All the translation in code taken from results.core.emailextractor
         # at results-2.2 is removed because it is specific to application.
@@ -1557,7 +2827,7 @@ class ExtractText:
             raise EmailExtractorError from exc
 
     def _decode_payload(self, payload, charset):
-        """Return decoded payload; try 'utf-8' then 'iso-8859-1'.
+        """Return decoded payload; try charset then 'iso-8859-1'.
 
         iso-8859-1 should not fail but if it does fall back to ascii with
         replacement of bytes that do not decode.
@@ -1566,21 +2836,15 @@ class ExtractText:
         every time it is done.
 
         """
-        for c in charset, "iso-8859-1":
-            try:
-                return self._accept_csv_file_with_nul_characters(
-                    payload.decode(encoding=c)
-                )
-            except UnicodeDecodeError:
-                pass
         return self._accept_csv_file_with_nul_characters(
-            payload.decode(encoding="ascii", errors="replace")
+            _decode_bytes(payload, (charset, "iso-8859-1"))[0]
         )
 
     def _accept_csv_file_with_nul_characters(self, csvstring):
         """Dialogue asking what to do with csv file with NULs."""
         nulcount = csvstring.count(_NUL)
         if nulcount:
+            _refuse_dialogue_in_worker()
             if (
                 tkinter.messagebox.askquestion(
                     parent=self._emailstore.parent,
@@ -1610,51 +2874,526 @@ class ExtractText:
 
         Try 'utf-8' then 'iso-8859-1' and finally 'ascii' with errors replaced.
 
+        The file is read once.
+
         """
-        for c in "utf-8", "iso-8859-1":
-            try:
-                with open(csvpath, encoding=c) as csvfile:
-                    return io.StringIO(csvfile.read())
-            except UnicodeDecodeError:
-                pass
-        try:
-            with open(csvpath, encoding="ascii", errors="replace") as csvfile:
-                return io.StringIO(csvfile.read())
-        except UnicodeDecodeError:
-            pass
-        return None
+        with open(csvpath, "rb") as csvfile:
+            data = csvfile.read()
+        return self._read_data(data)
+
+    def _read_data(self, data):
+        """Return StringIO object containing decoded data, a bytes object.
+
+        data is decoded as described in _read_file.
+
+        """
+        return io.StringIO(
+            _decode_bytes(
+                data, ("utf-8", "iso-8859-1"), translate_newlines=True
+            )[0]
+        )
 
     @property
     def edit_differences(self):
-        """Return list(difflin.ndiff()) of original and edited email text."""
+        """Return list(difflin.ndiff()) of original and edited email text.
+
+        The difference record is read from the difference store, if used,
+        rather than the difference file.  DifferenceStoreError is raised if
+        the store cannot be read.  A record in delta format is expanded to
+        the ndiff lines.
+
+        """
         if self._edit_differences is None:
-            try:
-                text = self._read_file(self.difference_file_path).readlines()
+            reader = self._read_difference()
+            if reader is not None:
+                text = reader.readlines()
+                if is_delta(text):
+                    text = expand_delta(text)
                 self._difference_file_exists = True
-            except FileNotFoundError:
+            else:
                 lines = "\n".join(self.extracted_text).splitlines(1)
-                text = list(difflib.ndiff(lines, lines))
+                text = list(_identity_ndiff(lines))
                 self._difference_file_exists = False
             self._edit_differences = text
         return self._edit_differences
 
+    def _read_difference(self):
+        """Return StringIO object containing difference record or None.
+
+        The record is read from the difference store, if used, or the
+        difference file.  None means there is no record.  A compressed record
+        is decompressed as it is read, and the decompressed bytes are decoded
+        as described in _read_file.
+
+        """
+        store = self._emailstore.difference_store
+        if store is None:
+            try:
+                with open(self.difference_file_path, "rb") as file:
+                    data = open_decompressed(file).read()
+            except FileNotFoundError:
+                return None
+            return self._read_data(data)
+        data = store.get(os.path.basename(self.difference_file_path))
+        if data is None:
+            return None
+        return self._read_data(decompress(data))
+
     def write_additional_file(self):
-        """Write difference file, utf-8 encoding, if file does not exist."""
+        """Write difference file, utf-8 encoding, if file does not exist.
+
+        The file is compressed if difference_compression is given.
+
+        """
         if self._difference_file_exists is False:
-            with open(
-                self.difference_file_path,
-                mode="w",
-                encoding="utf8",
-            ) as outfile:
-                outfile.writelines(self.edit_differences)
-                self._difference_file_exists = True
+            if self._emailstore.difference_compression is None:
+                with open(
+                    self.difference_file_path,
+                    mode="w",
+                    encoding="utf8",
+                ) as outfile:
+                    outfile.write(self._difference_text())
+            else:
+                with open(self.difference_file_path, mode="wb") as outfile:
+                    outfile.write(self._difference_data())
+            self._difference_file_exists = True
 
     @property
     def dates(self):
         """Return tuple(date, delivery_dates)."""
+        if self._date is None:
+            if self.index_entry is not None:
+                self._date = [
+                    parsedate_tz(d)[:-1]
+                    for d in self.index_entry.date.split("\n")
+                    if d
+                ]
+                self._delivery_date = [
+                    parsedate_tz(d)[:-1]
+                    for d in self.index_entry.delivery_date.split("\n")
+                    if d
+                ]
+            else:
+                headers = self.headers
+                self._date = [
+                    parsedate_tz(d)[:-1] for d in headers.get_all("date", [])
+                ]
+                self._delivery_date = [
+                    parsedate_tz(d)[:-1]
+                    for d in headers.get_all("delivery-date", [])
+                ]
         return self._date, self._delivery_date
 
 
+class _ContentTypeRule:
+    """Mixin for extractors of content types named in the configuration.
+
+    content_type_rule is the ExtractEmail attribute holding the content
+    types, pdf_content_type for example.
+
+    """
+
+    content_type_rule = None
+    cacheable = True
+
+    def content_types(self, emailstore):
+        """Return content types converted for ExtractEmail emailstore."""
+        return getattr(emailstore, self.content_type_rule)
+
+
+class _SpreadsheetRule:
+    """Mixin for extractors of attachments selected by the sheet rules."""
+
+    def is_selected(self, emailstore, filename):
+        """Return True if filename is selected by the sheet rules."""
+        return _is_spreadsheet_selected(emailstore, filename)
+
+
+class _PdfExtractor(_ContentTypeRule, Extractor):
+    """Convert pdf attachments with pdftotext, or pdfminer3k if installed."""
+
+    name = "pdf"
+    kind = _PDF
+    cost = COST_EXTERNAL if _PDFTOTEXT else COST_PARSE
+    content_type_rule = "pdf_content_type"
+
+    def is_available(self, emailstore):
+        """Return True if pdftotext or pdfminer3k is available."""
+        del emailstore
+        return bool(_PDFTOTEXT or pdfminer)
+
+    def extract(self, extracttext, filename, payload, text, charset=None):
+        """Append text converted from pdf payload to text list."""
+        del charset
+        if _PDFTOTEXT:
+            extracttext.get_pdf_text_using_xpdf(filename, payload, text)
+        else:
+            extracttext.get_pdf_text_using_pdfminer3k(filename, payload, text)
+
+
+class _SpreadsheetExtractor(_SpreadsheetRule, _ContentTypeRule, Extractor):
+    """Convert spreadsheet attachments with ssconvert."""
+
+    name = "ss"
+    kind = _SS
+    cost = COST_EXTERNAL
+    content_type_rule = "ss_content_type"
+
+    def is_available(self, emailstore):
+        """Return True if ssconvert is available."""
+        del emailstore
+        return bool(_SSTOCSV)
+
+    def extract(self, extracttext, filename, payload, text, charset=None):
+        """Append text converted from spreadsheet payload to text list."""
+        del charset
+        extracttext.get_ss_text_using_gnumeric(filename, payload, text)
+
+
+class _XlsxExtractor(_SpreadsheetRule, _ContentTypeRule, Extractor):
+    """Convert xlsx attachments natively, or with ssconvert or xlsx2csv."""
+
+    name = "xlsx"
+    kind = _XLSX
+    cost = COST_EXTERNAL
+    content_type_rule = "xlsx_content_type"
+
+    def is_available(self, emailstore):
+        """Return True if a way of converting xlsx payloads is available."""
+        return bool(
+            emailstore.xlsx_extractor == _NATIVE_XLSX or _SSTOCSV or xlsx2csv
+        )
+
+    def extract(self, extracttext, filename, payload, text, charset=None):
+        """Append text converted from xlsx payload to text list."""
+        del charset
+        if extracttext.emailstore.xlsx_extractor == _NATIVE_XLSX:
+            extracttext.get_xlsx_text_using_python_xml(filename, payload, text)
+        elif _SSTOCSV:
+            extracttext.get_ss_text_using_gnumeric(filename, payload, text)
+        else:
+            extracttext.get_ss_text_using_xlsx2csv(filename, payload, text)
+
+
+class _OdsExtractor(_SpreadsheetRule, _ContentTypeRule, Extractor):
+    """Convert ods attachments with ssconvert or Python's xml functions."""
+
+    name = "ods"
+    kind = _ODS
+    cost = COST_EXTERNAL if _SSTOCSV else COST_PARSE
+    content_type_rule = "ods_content_type"
+
+    def extract(self, extracttext, filename, payload, text, charset=None):
+        """Append text converted from ods payload to text list."""
+        del charset
+        if _SSTOCSV:
+            extracttext.get_ss_text_using_gnumeric(filename, payload, text)
+        else:
+            extracttext.get_ods_text_using_python_xml(filename, payload, text)
+
+
+class _CsvExtractor(_ContentTypeRule, Extractor):
+    """Extract csv attachments selected by the csv file rules."""
+
+    name = "csv"
+    kind = _CSV
+    cost = COST_CHEAP
+    cacheable = False
+    default_charset = "utf-8"
+    content_type_rule = "csv_content_type"
+
+    def is_selected(self, emailstore, filename):
+        """Return True if filename is selected by the csv file rules."""
+        if emailstore.include_csv_file:
+            return filename in emailstore.include_csv_file
+        if emailstore.exclude_csv_file:
+            return filename not in emailstore.exclude_csv_file
+        return True
+
+    def extract(self, extracttext, filename, payload, text, charset=None):
+        """Append text decoded from csv payload to text list."""
+        if not self.is_selected(extracttext.emailstore, filename):
+            return
+        text.append(extracttext.get_csv_text(payload, charset))
+
+
+class _TextExtractor(_ContentTypeRule, Extractor):
+    """Extract text attachments and bodies as they appear in the email."""
+
+    name = "text"
+    kind = _TXT
+    cost = COST_CHEAP
+    cacheable = False
+    default_charset = "iso-8859-1"
+    content_type_rule = "text_content_type"
+
+    def extract(self, extracttext, filename, payload, text, charset=None):
+        """Append text decoded from payload to text list."""
+        del filename
+        text.append(payload.decode(charset))
+
+
+class _DocxExtractor(_ContentTypeRule, Extractor):
+    """Extract text from docx attachments with Python's xml functions."""
+
+    name = "docx"
+    kind = _DOCX
+    content_type_rule = "docx_content_type"
+
+    def extract(self, extracttext, filename, payload, text, charset=None):
+        """Append text extracted from docx payload to text list."""
+        del filename, charset
+        text.append(
+            extracttext.get_docx_text(
+                payload, extracttext.emailstore.eventdirectory
+            )
+        )
+
+
+class _OdtExtractor(_ContentTypeRule, Extractor):
+    """Extract text from odt attachments with Python's xml functions."""
+
+    name = "odt"
+    kind = _ODT
+    content_type_rule = "odt_content_type"
+
+    def extract(self, extracttext, filename, payload, text, charset=None):
+        """Append text extracted from odt payload to text list."""
+        del filename, charset
+        text.append(
+            extracttext.get_odt_text(
+                payload, extracttext.emailstore.eventdirectory
+            )
+        )
+
+
+# The extractors registered first, in the order the content type rules are
+# applied to email parts and filename extensions to TNEF attachments.
+_BUILTIN_EXTRACTORS = (
+    _PdfExtractor(),
+    _SpreadsheetExtractor(),
+    _XlsxExtractor(),
+    _OdsExtractor(),
+    _CsvExtractor(),
+    _TextExtractor(),
+    _DocxExtractor(),
+    _OdtExtractor(),
+)
+
+
+def _initialize_extract_worker(extractemail):
+    """Set ExtractEmail instance used by an extract worker process."""
+    _extract_worker["extractemail"] = extractemail
+
+
+def _extract_text_in_worker(filename):
+    """Return (text, conversion failures) for email in filename in a worker.
+
+    None is returned if extracting the text needs a dialogue, which is shown
+    when the text is extracted in the application process.
+
+    """
+    extracttext = _extract_worker["extractemail"].email_in_file(filename)
+    try:
+        return extracttext.extracted_text, extracttext.conversion_failures
+    except _WorkerDialogueError:
+        return None
+
+
+def _refuse_dialogue_in_worker():
+    """Raise _WorkerDialogueError if called in an extract worker process."""
+    if _extract_worker:
+        raise _WorkerDialogueError("A dialogue cannot be shown by a worker")
+
+
+def _sorted_listing(directory):
+    """Return sorted list of names in directory.
+
+    The listing is cached and used again if the directory has not been
+    modified since the listing was done.  The listing is not cached if it
+    is done within _LISTING_MTIME_MARGIN of the modification time, because
+    a later change may not change the modification time.
+
+    """
+    listed = time.time_ns()
+    mtime = os.stat(directory).st_mtime_ns
+    cached = _mailstore_listings.get(directory)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    listing = sorted(os.listdir(directory))
+    if listed - mtime >= _LISTING_MTIME_MARGIN:
+        _mailstore_listings[directory] = (mtime, listing)
+    else:
+        _mailstore_listings.pop(directory, None)
+    return listing
+
+
+def _read_header_block(file):
+    """Return bytes from file up to and including blank line ending headers.
+
+    The whole file is returned if there is no blank line.
+
+    """
+    lines = []
+    for line in file:
+        lines.append(line)
+        if line in (b"\n", b"\r\n"):
+            break
+    return b"".join(lines)
+
+
+def _join_unfolded(values):
+    """Return header values, with line breaks removed, joined by newline.
+
+    The line breaks in folded header values would be taken as separators
+    when the joined values are split.
+
+    """
+    return "\n".join("".join(str(v).splitlines()) for v in values)
+
+
+def _minimal_pdf():
+    """Return bytes of a PDF document with one blank page."""
+    objects = (
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 72 72] >>",
+    )
+    document = [b"%PDF-1.4\n"]
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(sum(len(part) for part in document))
+        document.append(
+            b"".join((str(number).encode(), b" 0 obj\n", body, b"\nendobj\n"))
+        )
+    xref = sum(len(part) for part in document)
+    document.append(
+        b"".join((b"xref\n0 ", str(len(objects) + 1).encode(), b"\n"))
+    )
+    document.append(b"0000000000 65535 f \n")
+    for offset in offsets:
+        document.append(
+            b"".join((str(offset).zfill(10).encode(), b" 00000 n \n"))
+        )
+    document.append(
+        b"".join(
+            (
+                b"trailer\n<< /Size ",
+                str(len(objects) + 1).encode(),
+                b" /Root 1 0 R >>\nstartxref\n",
+                str(xref).encode(),
+                b"\n%%EOF\n",
+            )
+        )
+    )
+    return b"".join(document)
+
+
+def _zip_member_size_error(name, limit):
+    """Return ZipMemberSizeError for zip archive member name over limit."""
+    return ZipMemberSizeError(
+        "".join(
+            (
+                name,
+                " is larger than ",
+                str(limit),
+                " bytes when decompressed.",
+            )
+        )
+    )
+
+
+def _is_spreadsheet_selected(emailstore, filename):
+    """Return True if spreadsheet filename is selected by the sheet rules.
+
+    A filename named on exclude_ss_file_sheet lines is not selected.
+
+    """
+    if emailstore.include_ss_file_sheet:
+        return filename in emailstore.include_ss_file_sheet
+    if emailstore.exclude_ss_file_sheet:
+        return filename not in emailstore.exclude_ss_file_sheet
+    return True
+
+
+def _identity_ndiff(lines):
+    """Yield the lines of difflib.ndiff(lines, lines) in one pass.
+
+    ndiff marks each line common to both sequences with two spaces, so the
+    matching done by ndiff is not needed to compare lines with themselves.
+
+    """
+    for line in lines:
+        yield "".join(("  ", line))
+
+
+def _decode_bytes(data, charsets, translate_newlines=False):
+    """Return (text, charset) from data decoded by first charset which can.
+
+    data is decoded _DECODE_CHUNK_SIZE bytes at a time so a charset which
+    cannot decode data is abandoned at the first chunk it cannot decode,
+    and the text decoded by the charset which can is built in the same pass.
+    Unknown charsets are ignored.
+
+    charset is None, and text is data decoded as ascii with undecodable
+    bytes replaced, if none of charsets can decode data.
+
+    Line endings are translated to '\n' if translate_newlines is True.
+
+    """
+    view = memoryview(data)
+    tried = set()
+    for charset in charsets:
+        if charset in tried:
+            continue
+        tried.add(charset)
+        pieces = []
+        try:
+            decoder = codecs.getincrementaldecoder(charset)()
+            if translate_newlines:
+                decoder = io.IncrementalNewlineDecoder(decoder, True)
+            for start in range(0, len(view), _DECODE_CHUNK_SIZE):
+                pieces.append(
+                    decoder.decode(view[start : start + _DECODE_CHUNK_SIZE])
+                )
+            pieces.append(decoder.decode(b"", final=True))
+        except (UnicodeDecodeError, LookupError):
+            continue
+        return "".join(pieces), charset
+    decoder = codecs.getincrementaldecoder("ascii")(errors="replace")
+    if translate_newlines:
+        decoder = io.IncrementalNewlineDecoder(decoder, True)
+    return decoder.decode(view, final=True), None
+
+
+def _csv_sniff_sample(text, size):
+    """Return up to size characters from start of text for csv.Sniffer.
+
+    The sample ends at the end of a line if text is longer than size, and
+    is all of text if size is 0.
+
+    """
+    if not size or len(text) <= size:
+        return text
+    end = text.rfind("\n", 0, size)
+    if end < 1:
+        return text[:size]
+    return text[: end + 1]
+
+
+def _ssconvert_sheet_options(sheets):
+    """Return ssconvert export options to convert just the named sheets.
+
+    ssconvert matches the sheet names in double quotes after backslash and
+    double quote characters are escaped.
+
+    """
+    return " ".join(
+        'sheet="%s"' % name.replace("\\", "\\\\").replace('"', '\\"')
+        for name in sorted(sheets)
+    )
+
+
 def _decode_header(value):
     """Decode value according to RFC2231 and return the decoded string."""
     b, c = email.header.decode_header(value)[0]
@@ -0,0 +1,189 @@
+# extractors.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""Extractors which convert email parts to text, and the registry of them.
+
+Each kind of email part, pdf or csv for example, is converted by an Extractor
+instance.  The ExtractorRegistry maps content types and filename extensions
+to extractors.
+
+Extractors provided by other packages are found through the entry points in
+the ENTRY_POINT_GROUP group.  The entry point is a callable, usually an
+Extractor subclass, which returns an Extractor when called with no arguments.
+Content types handled by the extractors in emailextract are not taken over
+by these extractors.
+
+"""
+
+import importlib.metadata
+
+# The group of entry points which give extractors from other packages.
+ENTRY_POINT_GROUP = "emailextract.extractors"
+
+# The cost classes of extractors.  COST_CHEAP extractors decode the part,
+# COST_PARSE extractors parse the part in Python, and COST_EXTERNAL extractors
+# run another program.
+COST_CHEAP = "cheap"
+COST_PARSE = "parse"
+COST_EXTERNAL = "external"
+
+
+class ExtractorError(Exception):
+    """Exception class for extractors module."""
+
+
+class Extractor:
+    """Convert a kind of email part to text.
+
+    kind names the extractor and must be set: two extractors cannot have
+    the same kind.  A kind starting with '.' is the filename extension, like
+    '.pdf', of the parts converted and is used to select the extractor for
+    attachments wrapped in TNEF attachments.
+
+    cost is one of COST_CHEAP, COST_PARSE, or COST_EXTERNAL.  process_safe
+    says whether the extractor can be used in worker processes.  cacheable
+    says whether the text may be kept in the text cache: it should be the
+    same each time the part is converted.
+
+    default_charset is the charset given to extract if the part does not
+    give one, or None if the part's charset is not relevant.
+
+    version should be changed when a change to extract changes the text
+    extracted, so text cached earlier is not used.
+
+    """
+
+    name = None
+    kind = None
+    cost = COST_PARSE
+    process_safe = True
+    cacheable = False
+    default_charset = None
+    version = 1
+
+    # Content types converted if content_types() is not overridden.
+    default_content_types = frozenset()
+
+    def content_types(self, emailstore):
+        """Return content types converted for ExtractEmail emailstore."""
+        del emailstore
+        return self.default_content_types
+
+    def is_available(self, emailstore):
+        """Return True if the extractor can be used for emailstore."""
+        del emailstore
+        return True
+
+    def is_selected(self, emailstore, filename):
+        """Return True if the rules of emailstore select part filename.
+
+        This is called before the part is decoded: parts which are not
+        selected are not decoded.
+
+        """
+        del emailstore, filename
+        return True
+
+    def extract(self, extracttext, filename, payload, text, charset=None):
+        """Append text converted from payload to text list.
+
+        extracttext is the ExtractText instance for the email containing
+        payload, the decoded part named filename.
+
+        """
+        raise NotImplementedError
+
+
+class ExtractorRegistry:
+    """Map content types and filename extensions to Extractors.
+
+    The first extractor registered for a content type is used.
+
+    """
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._extractors = []
+        self._by_kind = {}
+        self._by_content_type = {}
+
+    def register(self, extractor, content_types):
+        """Register extractor for content_types and it's kind.
+
+        ExtractorError is raised if extractor's kind is None or is the kind
+        of an extractor already registered.
+
+        """
+        if extractor.kind is None:
+            raise ExtractorError(
+                "".join(("Extractor ", str(extractor.name), " has no kind"))
+            )
+        if extractor.kind in self._by_kind:
+            raise ExtractorError(
+                "".join(
+                    (
+                        "Extractor ",
+                        str(extractor.name),
+                        " has the same kind, '",
+                        extractor.kind,
+                        "', as extractor ",
+                        str(self._by_kind[extractor.kind].name),
+                    )
+                )
+            )
+        self._extractors.append(extractor)
+        self._by_kind[extractor.kind] = extractor
+        for content_type in content_types:
+            self._by_content_type.setdefault(content_type, extractor)
+
+    def load_entry_points(self, emailstore, group=ENTRY_POINT_GROUP):
+        """Register extractors given by entry points in group.
+
+        Return list of (entry point name, exception) for entry points which
+        could not be loaded.
+
+        """
+        failures = []
+        for entry_point in _entry_points(group):
+            try:
+                extractor = entry_point.load()()
+                content_types = extractor.content_types(emailstore)
+                self.register(extractor, content_types)
+            except Exception as exc:
+                failures.append((entry_point.name, exc))
+        return failures
+
+    def for_content_type(self, content_type):
+        """Return extractor for content_type or None."""
+        return self._by_content_type.get(content_type)
+
+    def for_kind(self, kind):
+        """Return extractor for kind or None."""
+        return self._by_kind.get(kind)
+
+    def for_filename(self, filename):
+        """Return extractor whose kind is the extension of filename or None."""
+        name = filename.lower()
+        for extractor in self._extractors:
+            if extractor.kind.startswith(".") and name.endswith(
+                extractor.kind
+            ):
+                return extractor
+        return None
+
+    def configured(self):
+        """Return extractors registered for at least one content type."""
+        extractors = []
+        for extractor in self._by_content_type.values():
+            if extractor not in extractors:
+                extractors.append(extractor)
+        return extractors
+
+
+def _entry_points(group):
+    """Return entry points in group."""
+    entry_points = importlib.metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        return entry_points.select(group=group)
+    return entry_points.get(group, ())  # Python 3.9.
@@ -0,0 +1,75 @@
+# fingerprints.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""Fingerprints of difference files held in a sqlite3 database.
+
+A fingerprint is a hash of the text extracted from an email when it's
+difference file was last found to hold that text, and the modification time
+and size of the difference file then.  The difference file need not be read
+to know it still holds the text if the fingerprint is unchanged.
+
+"""
+
+import sqlite3
+
+_CREATE_TABLE = "".join(
+    (
+        "create table if not exists fingerprint (",
+        "name text primary key, ",
+        "digest text, ",
+        "mtime integer, ",
+        "size integer)",
+    )
+)
+_SELECT_ALL = "select name, digest, mtime, size from fingerprint"
+_REPLACE = "insert or replace into fingerprint values (?, ?, ?, ?)"
+
+
+class DifferenceFingerprints:
+    """Persistent fingerprints of difference files keyed by file name.
+
+    Errors in the database are treated as if there are no fingerprints, so
+    the difference files are read instead.
+
+    """
+
+    def __init__(self, path):
+        """Note fingerprint database path."""
+        self.path = path
+
+    def _connect(self):
+        """Return connection to database, creating table if needed."""
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(_CREATE_TABLE)
+        return connection
+
+    def get_fingerprints(self):
+        """Return dict of (digest, mtime, size) keyed by file name."""
+        try:
+            connection = self._connect()
+            try:
+                rows = connection.execute(_SELECT_ALL).fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return {}
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def put_fingerprints(self, fingerprints):
+        """Add (name, digest, mtime, size) fingerprints in one transaction.
+
+        The database is not changed if it cannot be updated.
+
+        """
+        if not fingerprints:
+            return
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.executemany(_REPLACE, fingerprints)
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            pass
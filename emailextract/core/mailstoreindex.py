@@ -0,0 +1,135 @@
+# mailstoreindex.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""Index of the emails in a mailstore directory held in a sqlite3 database.
+
+The index records the headers used to select and summarise emails so that
+selection does not parse every email file each time it is done.
+
+An index entry is refreshed when the size or modification time of the email
+file changes, otherwise the email file is not opened.
+
+"""
+
+import os
+import sqlite3
+import collections
+
+IndexEntry = collections.namedtuple(
+    "IndexEntry",
+    (
+        "filename",
+        "size",
+        "mtime",
+        "from_address",
+        "generated_filename",
+        "date",
+        "delivery_date",
+        "subject",
+        "content_types",
+    ),
+)
+
+# The values derived from the email headers, in IndexEntry order.
+HEADER_FIELDS = IndexEntry._fields[3:]
+
+_CREATE_TABLE = "".join(
+    (
+        "create table if not exists email (",
+        "filename text primary key, ",
+        "size integer, ",
+        "mtime integer, ",
+        "from_address text, ",
+        "generated_filename text, ",
+        "date text, ",
+        "delivery_date text, ",
+        "subject text, ",
+        "content_types text)",
+    )
+)
+_SELECT_ALL = "select * from email"
+_REPLACE = "insert or replace into email values (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_DELETE = "delete from email where filename = ?"
+
+
+class MailstoreIndexError(Exception):
+    """Exception class for mailstoreindex module."""
+
+
+class MailstoreIndex:
+    """Index of emails, one per file, in a mailstore directory."""
+
+    def __init__(self, path, mailstore):
+        """Note index database path and mailstore directory it indexes."""
+        self.path = path
+        self.mailstore = mailstore
+
+    def refresh(self, filenames, header_values, listing=None):
+        """Bring index up to date for filenames and return their entries.
+
+        filenames - the email files whose entries are returned
+        header_values - function(filename) returning HEADER_FIELDS values
+        listing - all files in mailstore: entries for other files are removed
+
+        header_values is called only for files which are not in the index or
+        whose size or modification time differs from the index entry.
+
+        """
+        try:
+            connection = sqlite3.connect(self.path)
+        except sqlite3.Error as exc:
+            raise MailstoreIndexError(str(exc)) from exc
+        try:
+            with connection:
+                connection.execute(_CREATE_TABLE)
+                existing = {
+                    row[0]: IndexEntry(*row)
+                    for row in connection.execute(_SELECT_ALL)
+                }
+                entries = {}
+                for filename in filenames:
+                    try:
+                        stat = os.stat(os.path.join(self.mailstore, filename))
+                    except FileNotFoundError:
+                        if filename in existing:
+                            connection.execute(_DELETE, (filename,))
+                        continue
+                    entry = existing.get(filename)
+                    if (
+                        entry is None
+                        or entry.size != stat.st_size
+                        or entry.mtime != stat.st_mtime_ns
+                    ):
+                        entry = IndexEntry(
+                            filename,
+                            stat.st_size,
+                            stat.st_mtime_ns,
+                            *header_values(filename)
+                        )
+                        connection.execute(_REPLACE, entry)
+                    entries[filename] = entry
+                if listing is not None:
+                    for filename in existing.keys() - set(listing):
+                        connection.execute(_DELETE, (filename,))
+        except sqlite3.Error as exc:
+            raise MailstoreIndexError(str(exc)) from exc
+        finally:
+            connection.close()
+        return entries
+
+
+def index_text(value):
+    """Return value as str safe for storing in the index database.
+
+    Header values from emails with undeclared 8-bit characters may contain
+    surrogate escapes which sqlite3 cannot encode.
+
+    """
+    if value is None:
+        return ""
+    return (
+        str(value)
+        .encode("utf-8", errors="surrogateescape")
+        .decode("utf-8", errors="replace")
+    )
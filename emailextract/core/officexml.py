@@ -0,0 +1,524 @@
+# officexml.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""Parse the XML documents in docx, odt, ods, and xlsx, attachments.
+
+The document is parsed by xml.etree.ElementTree.iterparse and each record,
+a paragraph or table row for example, is removed from the tree once it has
+been processed.  Elements outside records are removed when they end.  So
+the tree holds the open elements and one record rather than the document.
+
+The sheets of xlsx workbooks are converted to csv format text in memory.
+
+"""
+
+import xml.etree.ElementTree
+import csv
+import datetime
+import io
+import posixpath
+import re
+
+# The namespaces of the spreadsheetml elements in transitional and strict
+# xlsx workbooks.
+_XLSX_MAIN = (
+    "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "http://purl.oclc.org/ooxml/spreadsheetml/main",
+)
+_RELATIONSHIP_ID = {
+    "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id",
+    "{http://purl.oclc.org/ooxml/officeDocument/relationships}id",
+}
+
+# The parts of an xlsx workbook and the content types which identify them.
+_CONTENT_TYPES_PART = "[Content_Types].xml"
+_XLSX_WORKBOOK = "/xl/workbook.xml"
+_SPREADSHEETML = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+_WORKBOOK_TYPE = _SPREADSHEETML + ".sheet.main+xml"
+_SHARED_STRINGS_TYPE = _SPREADSHEETML + ".sharedStrings+xml"
+_STYLES_TYPE = _SPREADSHEETML + ".styles+xml"
+
+# The number formats with an implied numFmtId.
+_STANDARD_FORMATS = {
+    0: "general",
+    1: "0",
+    2: "0.00",
+    3: "#,##0",
+    4: "#,##0.00",
+    9: "0%",
+    10: "0.00%",
+    11: "0.00e+00",
+    12: "# ?/?",
+    13: "# ??/??",
+    14: "mm-dd-yy",
+    15: "d-mmm-yy",
+    16: "d-mmm",
+    17: "mmm-yy",
+    18: "h:mm am/pm",
+    19: "h:mm:ss am/pm",
+    20: "h:mm",
+    21: "h:mm:ss",
+    22: "m/d/yy h:mm",
+    37: "#,##0 ;(#,##0)",
+    38: "#,##0 ;[red](#,##0)",
+    39: "#,##0.00;(#,##0.00)",
+    40: "#,##0.00;[red](#,##0.00)",
+    45: "mm:ss",
+    46: "[h]:mm:ss",
+    47: "mmss.0",
+    48: "##0.0e+0",
+    49: "@",
+}
+
+# The way values are formatted for the number formats known to xlsx2csv.
+_FORMAT_TYPES = {
+    "general": "float",
+    "0": "float",
+    "0.00": "float",
+    "#,##0": "float",
+    "#,##0.00": "float",
+    "0%": "percentage",
+    "0.00%": "percentage",
+    "0.00e+00": "float",
+    "mm-dd-yy": "date",
+    "d-mmm-yy": "date",
+    "d-mmm": "date",
+    "mmm-yy": "date",
+    "h:mm am/pm": "date",
+    "h:mm:ss am/pm": "date",
+    "h:mm": "time",
+    "h:mm:ss": "time",
+    "m/d/yy h:mm": "date",
+    "#,##0 ;(#,##0)": "float",
+    "#,##0 ;[red](#,##0)": "float",
+    "#,##0.00;(#,##0.00)": "float",
+    "#,##0.00;[red](#,##0.00)": "float",
+    "mm:ss": "time",
+    "[h]:mm:ss": "time",
+    "mmss.0": "time",
+    "##0.0e+0": "float",
+    "@": "float",
+    "yyyy-mm-dd": "date",
+    "dd/mm/yy": "date",
+    "hh:mm:ss": "time",
+    "dd/mm/yy hh:mm": "date",
+    "dd/mm/yyyy hh:mm:ss": "date",
+    "yy-mm-dd": "date",
+    "d-mmm-yyyy": "date",
+    "m/d/yy": "date",
+    "m/d/yyyy": "date",
+    "dd-mmm-yyyy": "date",
+    "dd/mm/yyyy": "date",
+    "mm/dd/yy h:mm am/pm": "date",
+    "mm/dd/yy hh:mm": "date",
+    "mm/dd/yyyy h:mm am/pm": "date",
+    "mm/dd/yyyy hh:mm:ss": "date",
+    "yyyy-mm-dd hh:mm:ss": "date",
+    "#,##0;(#,##0)": "float",
+    '_(* #,##0_);_(* (#,##0);_(* "-"??_);_(@_)': "float",
+    '_(* #,##0.00_);_(* (#,##0.00);_(* "-"??_);_(@_)': "float",
+}
+
+# Tests on values and number formats for formats not in _FORMAT_TYPES.
+_UNSIGNED_NUMBER = re.compile(r"^\d+(\.\d+)?$")
+_SIGNED_NUMBER = re.compile(r"^-?\d+(.\d+)?$")
+_DATE_CODE = re.compile(r".*[hsmdyY]")
+_ELAPSED_CODE = re.compile(r".*\[.*[dmhys].*\]")
+_CELL_REFERENCE = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def iterrecords(source, records, boundaries=frozenset()):
+    """Yield (event, element) for records and boundaries in XML in source.
+
+    source - file object, or name, containing the XML document
+    records - tags of elements yielded complete, including their tail
+    boundaries - tags of elements whose start and end are yielded
+
+    The event is "record" for an element with a tag in records which is not
+    inside another record.  Records inside a record are yielded only as part
+    of the outer record.
+
+    The event is "start" or "end" for an element with a tag in boundaries
+    which is not inside a record.  Only the attributes of the element are
+    available at "start", and the records inside it have been removed by
+    "end".
+
+    """
+    stack = []
+    record = None
+    pending = None
+    for event, element in xml.etree.ElementTree.iterparse(
+        source, events=("start", "end")
+    ):
+
+        # The tail of a record is known when the next event happens.
+        if pending is not None:
+            yield "record", pending
+            if stack:
+                stack[-1].remove(pending)
+            pending = None
+
+        if event == "start":
+            stack.append(element)
+            if record is None:
+                if element.tag in records:
+                    record = element
+                elif element.tag in boundaries:
+                    yield event, element
+            continue
+        stack.pop()
+        if record is None:
+            if element.tag in boundaries:
+                yield event, element
+            if stack:
+                stack[-1].remove(element)
+        elif element is record:
+            pending = record
+            record = None
+    if pending is not None:
+        yield "record", pending
+
+
+class XlsxWorkbook:
+    """Convert the sheets in an xlsx workbook to csv format text.
+
+    The text is the text xlsx2csv, version 0.8, writes to csv files for
+    the options used by emailextract: skip_empty_lines, and dates formatted
+    by dateformat.  Hidden rows are not included.
+
+    Error cells, which make xlsx2csv fail when formatted as numbers, are
+    given as the error text.
+
+    """
+
+    def __init__(self, names, open_member, dateformat="%Y-%m-%d"):
+        """Read the workbook, shared strings, and styles, parts.
+
+        names - names of the members of the xlsx zip archive
+        open_member - function(name) returning binary file for member name
+        dateformat - strftime format for dates
+
+        """
+        self._names = {name.lower(): name for name in names}
+        self._open_member = open_member
+        self.dateformat = dateformat
+        self.timeformat = "%H:%M"
+        workbook = _XLSX_WORKBOOK
+        shared_strings = None
+        styles = None
+        root = self._parse(_CONTENT_TYPES_PART)
+        if root is not None:
+            for override in root:
+                if _local_name(override.tag) != "Override":
+                    continue
+                content_type = override.get("ContentType")
+                if content_type == _WORKBOOK_TYPE:
+                    workbook = override.get("PartName")
+                elif content_type == _SHARED_STRINGS_TYPE:
+                    shared_strings = override.get("PartName")
+                elif content_type == _STYLES_TYPE:
+                    styles = override.get("PartName")
+        self.date1904 = False
+        self.sheets = []
+        relationships = self._relationships(workbook)
+        root = self._parse(workbook)
+        if root is not None:
+            for element in root.iter():
+                name = _local_name(element.tag)
+                if name == "workbookPr":
+                    self.date1904 = (
+                        element.get("date1904", "false").lower().strip()
+                        != "false"
+                    )
+                elif name == "sheet":
+                    relation_id = None
+                    for key, value in element.attrib.items():
+                        if key in _RELATIONSHIP_ID:
+                            relation_id = value
+                    self.sheets.append(
+                        (
+                            element.get("name"),
+                            relationships.get(relation_id),
+                        )
+                    )
+        self.shared_strings = self._read_shared_strings(shared_strings)
+        self.number_formats, self.cell_formats = self._read_styles(styles)
+
+    def _member_name(self, part):
+        """Return archive member name for part name or None."""
+        if part is None:
+            return None
+        return self._names.get(part.lstrip("/").lower())
+
+    def _parse(self, part):
+        """Return root element of XML in part or None if part is absent."""
+        name = self._member_name(part)
+        if name is None:
+            return None
+        with self._open_member(name) as file:
+            return xml.etree.ElementTree.parse(file).getroot()
+
+    def _relationships(self, part):
+        """Return dict of relationship targets, by id, for part."""
+        directory, base = posixpath.split(part)
+        root = self._parse(posixpath.join(directory, "_rels", base + ".rels"))
+        relationships = {}
+        if root is not None:
+            for element in root:
+                if element.get("Id") is not None:
+                    relationships[element.get("Id")] = element.get("Target")
+        return relationships
+
+    def _read_shared_strings(self, part):
+        """Return list of shared strings, without phonetic text, in part."""
+        strings = []
+        name = self._member_name(part)
+        if name is None:
+            return strings
+        with self._open_member(name) as file:
+            for _, record in iterrecords(file, _tags("si")):
+                text = []
+                for element in record:
+                    tag = _local_name(element.tag)
+                    if tag == "t":
+                        text.append(element.text or "")
+                    elif tag == "r":
+                        for run in element:
+                            if _local_name(run.tag) == "t":
+                                text.append(run.text or "")
+                strings.append("".join(text))
+        return strings
+
+    def _read_styles(self, part):
+        """Return number formats and cell number format ids from part."""
+        number_formats = {}
+        cell_formats = []
+        root = self._parse(part)
+        if root is None:
+            return number_formats, cell_formats
+        for element in root:
+            tag = _local_name(element.tag)
+            if tag == "numFmts":
+                for numfmt in element:
+                    number_formats[int(numfmt.get("numFmtId"))] = (
+                        numfmt.get("formatCode").lower().replace("\\", "")
+                    )
+            elif tag == "cellXfs":
+                for xf in element:
+                    if _local_name(xf.tag) != "xf":
+                        continue
+                    numfmtid = xf.get("numFmtId")
+                    if numfmtid is None:
+                        cell_formats.append(None)
+                        continue
+                    numfmtid = int(numfmtid)
+                    if (
+                        numfmtid not in number_formats
+                        and numfmtid not in _STANDARD_FORMATS
+                    ):
+                        numfmtid = xf.get("applyNumberFormat")
+                        if numfmtid is not None:
+                            numfmtid = int(numfmtid)
+                    cell_formats.append(numfmtid)
+        return number_formats, cell_formats
+
+    def _sheet_member(self, index, target):
+        """Return archive member name for sheet at index or None."""
+        if target is not None:
+            if target.startswith(("/", "xl/")):
+                name = self._member_name(target)
+            else:
+                name = self._member_name("xl/" + target)
+            if name is not None:
+                return name
+        for part in (
+            "".join(("xl/worksheets/sheet", str(index), ".xml")),
+            "".join(("xl/worksheets/worksheet", str(index), ".xml")),
+        ):
+            name = self._member_name(part)
+            if name is not None:
+                return name
+        return None
+
+    def sheet_csv(self, sheet):
+        """Return csv format text for sheet, or None if sheet is absent.
+
+        sheet is the name of a sheet in the sheets attribute.
+
+        """
+        for index, (name, target) in enumerate(self.sheets):
+            if name == sheet:
+                break
+        else:
+            return None
+        member = self._sheet_member(index + 1, target)
+        if member is None:
+            return None
+        csvfile = io.StringIO()
+        writer = csv.writer(csvfile, lineterminator="\n")
+        columns_count = -1
+        with self._open_member(member) as file:
+            for event, element in iterrecords(
+                file, _tags("row"), boundaries=_tags("dimension")
+            ):
+                if event == "start":
+                    columns_count = _dimension_columns(element.get("ref"))
+                elif event == "record":
+                    row = self._row(element)
+                    if row is None or row.count("") == len(row):
+                        continue
+                    while len(row) < columns_count:
+                        row.append("")
+                    writer.writerow(row)
+
+        # xlsx2csv's csv files are read in text mode, which translates the
+        # line endings within cell values.
+        return csvfile.getvalue().replace("\r\n", "\n").replace("\r", "\n")
+
+    def _row(self, row):
+        """Return list of cell values in row or None if there are none."""
+        number = row.get("r")
+        if number is None or row.get("hidden") == "1":
+            return None
+        columns = {}
+        letters = ""
+        index = 0
+        for cell in row:
+            if _local_name(cell.tag) != "c":
+                continue
+            reference = cell.get("r")
+            if reference:
+                letters = reference[: len(reference) - len(number)]
+                index = 0
+            else:
+                index += 1
+            column = 0
+            for letter in letters:
+                column = column * 26 + ord(letter) - 64
+            columns[column - 1 + index] = self._cell_value(cell)
+        if not columns:
+            return None
+        if min(columns) < 0:
+            return [columns[k] for k in sorted(columns)]
+        values = [""] * (max(columns) + 1)
+        for key, value in columns.items():
+            values[key] = value
+        spans = row.get("spans")
+        if spans:
+            width = int(spans.split(" ")[-1].split(":")[1])
+            if len(values) < width:
+                values.extend([""] * (width - len(values)))
+        return values
+
+    def _cell_value(self, cell):
+        """Return text for value of cell formatted as xlsx2csv does."""
+        cell_type = cell.get("t")
+        value = None
+        for element in cell:
+            tag = _local_name(element.tag)
+            if tag == "v":
+                value = element.text
+                break
+            if tag == "is":
+                for text in element.iter():
+                    if _local_name(text.tag) == "t":
+                        value = text.text
+                        break
+                break
+        if not value:
+            return ""
+        if cell_type == "s":
+            return self.shared_strings[int(value)]
+        if cell_type == "b":
+            if value == "1":
+                return "TRUE"
+            if value == "0":
+                return "FALSE"
+            return value
+        if cell_type in ("str", "inlineStr"):
+            return value
+        format_type = None
+        format_code = "general"
+        style = cell.get("s")
+        if style:
+            style = int(style)
+            numfmtid = None
+            if style < len(self.cell_formats):
+                numfmtid = self.cell_formats[style]
+            format_code = self.number_formats.get(
+                numfmtid, _STANDARD_FORMATS.get(numfmtid, format_code)
+            )
+            if format_code in _FORMAT_TYPES:
+                format_type = _FORMAT_TYPES[format_code]
+            elif (
+                _UNSIGNED_NUMBER.match(value)
+                and _DATE_CODE.match(format_code)
+                and not _ELAPSED_CODE.match(format_code)
+            ):
+                format_type = "time" if float(value) < 1 else "date"
+            elif _SIGNED_NUMBER.match(value):
+                format_type = "float"
+        elif cell_type == "n":
+            format_type = "float"
+        try:
+            return self._format_value(value, format_type, format_code)
+        except (ValueError, OverflowError):
+            return value
+
+    def _format_value(self, value, format_type, format_code):
+        """Return value formatted for format_type and format_code."""
+        if format_type == "date":
+            if self.date1904:
+                epoch = datetime.datetime(1904, 1, 1)
+            else:
+                epoch = datetime.datetime(1899, 12, 30)
+            date = epoch + datetime.timedelta(float(value))
+            return date.strftime(self.dateformat)
+        if format_type == "time":
+            seconds = int(round((float(value) % 1) * 24 * 60 * 60, 6))
+            return datetime.time(
+                int((seconds // 3600) % 24),
+                int((seconds // 60) % 60),
+                int(seconds % 60),
+            ).strftime(self.timeformat)
+        if format_type != "float":
+            return value
+        if "E" in value or "e" in value:
+            return format(float(value), "f")
+        if format_code[0:3] == "0.0":
+            places = len(format_code.split(".")[1])
+            if "%" in format_code:
+                places += 1
+            return format(float(value), "".join((".", str(places), "f")))
+        return format(float(value), "f").rstrip("0").rstrip(".")
+
+
+def _local_name(tag):
+    """Return tag without it's namespace."""
+    return tag.rpartition("}")[2]
+
+
+def _tags(name):
+    """Return set of name in the spreadsheetml namespaces."""
+    return {"".join(("{", namespace, "}", name)) for namespace in _XLSX_MAIN}
+
+
+def _dimension_columns(reference):
+    """Return number of columns in dimension reference, like 'A1:D9'."""
+    if reference is None:
+        return -1
+    cells = reference.split(":")
+    if len(cells) < 2:
+        return -1
+    start = _CELL_REFERENCE.match(cells[0])
+    end = _CELL_REFERENCE.match(cells[1])
+    if not start or not end:
+        return -1
+    columns = []
+    for letters in start.group(1), end.group(1):
+        column = 0
+        for letter in letters:
+            column = column * 26 + ord(letter) - 64
+        columns.append(column)
+    return max(1, columns[1] - columns[0] + 1)
@@ -0,0 +1,233 @@
+# pdfengine.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""Extract text from PDF documents using pdfminer3k.
+
+One PdfMinerEngine is used for all the PDF attachments converted in a process
+so layout parameters, and fonts which do not depend on the document they are
+found in, are created once rather than once per document.
+
+The pages read from each document can be limited by page number, by number of
+pages, and by the time taken.
+
+"""
+
+import io
+import time
+
+try:
+    from pdfminer import pdfinterp, pdfparser, layout, converter
+    from pdfminer.pdfinterp import PDFResourceManager
+    from pdfminer.psparser import PSLiteral
+    from pdfminer.pdftypes import resolve1
+except ImportError:  # Not ModuleNotFoundError for Pythons earlier than 3.6
+    pdfinterp = None
+
+    # _ResourceManager is defined but cannot be used without pdfminer3k.
+    PDFResourceManager = object
+
+# The font types which can be shared by documents if the font specification
+# has nothing but these keys.  pdfminer3k caches fonts by object number, which
+# is unique only within a document, so other fonts are cached per document.
+_SHARED_FONT_TYPES = frozenset(("Type1", "TrueType"))
+_SHARED_FONT_KEYS = frozenset(
+    ("Type", "Subtype", "BaseFont", "Name", "Encoding")
+)
+
+
+def parse_page_ranges(value):
+    """Return tuple of (first, last) page ranges in value, a str.
+
+    value is a comma separated list of page numbers, counting from 1, and
+    ranges like '3-5'.  A range like '7-' means page 7 to the last page and
+    last is None.  ValueError is raised if value is not a list of ranges.
+
+    """
+    ranges = []
+    for item in value.split(","):
+        first, sep, last = item.strip().partition("-")
+        first = int(first)
+        if not sep:
+            last = first
+        elif last.strip():
+            last = int(last)
+        else:
+            last = None
+        if first < 1 or (last is not None and last < first):
+            raise ValueError("".join(("'", item.strip(), "' is not a range")))
+        ranges.append((first, last))
+    return tuple(ranges)
+
+
+def _shared_font_key(spec):
+    """Return key for font in spec if it can be shared, or None.
+
+    A simple font named by the document without widths, descriptor, or
+    embedded font file is built from the font metrics in pdfminer3k and is
+    the same in every document.
+
+    """
+    if not _SHARED_FONT_KEYS.issuperset(spec):
+        return None
+    values = []
+    for name in "Subtype", "BaseFont", "Encoding":
+        value = resolve1(spec.get(name))
+        if value is None and name == "Encoding":
+            values.append(None)
+            continue
+        if not isinstance(value, PSLiteral):
+            return None
+        values.append(value.name)
+    if values[0] not in _SHARED_FONT_TYPES:
+        return None
+    return tuple(values)
+
+
+class _ResourceManager(PDFResourceManager):
+    """Resource manager which shares document independent fonts.
+
+    Fonts cached by object number are discarded at the start of each
+    document.
+
+    """
+
+    def __init__(self):
+        """Create resource manager with empty shared font cache."""
+        super().__init__(caching=True)
+        self._shared_fonts = {}
+
+    def begin_document(self):
+        """Discard fonts cached by object number for previous document."""
+        self._cached_fonts.clear()
+
+    def get_font(self, objid, spec):
+        """Return font for spec, shared with other documents if it can."""
+        key = _shared_font_key(spec)
+        if key is None:
+            return super().get_font(objid, spec)
+        font = self._shared_fonts.get(key)
+        if font is None:
+            font = super().get_font(None, spec)
+            self._shared_fonts[key] = font
+        return font
+
+
+class PdfMinerEngine:
+    """Convert PDF documents to text within page and time limits."""
+
+    def __init__(self, pages=None, max_pages=None, time_limit=None):
+        """Set limits on pages read from each document; None means no limit.
+
+        pages - tuple of (first, last) page ranges from parse_page_ranges
+        max_pages - number of pages read from each document
+        time_limit - seconds allowed for reading each document
+
+        """
+        self.pages = pages
+        self.max_pages = max_pages
+        self.time_limit = time_limit
+        self._resource_manager = None
+        self._layouts = {}
+
+    def __getstate__(self):
+        """Return state for pickling without the resource manager."""
+        state = self.__dict__.copy()
+        state["_resource_manager"] = None
+        return state
+
+    def layout(self, **k):
+        """Return pdfminer3k LAParams with arguments k overriding defaults.
+
+        Arguments which are not LAParams attributes are ignored.
+
+        """
+        key = tuple(sorted(k.items()))
+        laparams = self._layouts.get(key)
+        if laparams is None:
+            laparams = layout.LAParams()
+            for a in laparams.__dict__:
+                if a in k:
+                    laparams.__dict__[a] = k[a]
+            self._layouts[key] = laparams
+        return laparams
+
+    def _is_page_selected(self, pageno):
+        """Return True if pageno, counting from 1, is in a page range."""
+        if not self.pages:
+            return True
+        for first, last in self.pages:
+            if first <= pageno and (last is None or pageno <= last):
+                return True
+        return False
+
+    def _is_past_last_page(self, pageno):
+        """Return True if pageno is after all the page ranges."""
+        if not self.pages:
+            return False
+        for _, last in self.pages:
+            if last is None or pageno <= last:
+                return False
+        return True
+
+    def extract(self, payload, laparams):
+        """Return (text, failure) from PDF document payload.
+
+        failure is None, or the reason why reading stopped before all the
+        selected pages were read.  Pages beyond max_pages are not counted as
+        a failure.
+
+        """
+        if self._resource_manager is None:
+            self._resource_manager = _ResourceManager()
+        rsrcmgr = self._resource_manager
+        rsrcmgr.begin_document()
+        failure = None
+
+        # Adapted from pdf2txt.py script included in pdfminer3k-1.3.1.
+        # On some *.pdf inputs the script raises UnicodeEncodeError:
+        # 'ascii' codec can't encode character ...
+        # which does not happen with the adaption below.
+        # A sample ... is '\u2019 in position 0: ordinal not in range(128)'.
+        # Changing 'outfp = io.open(...)' to 'outfp = open(...)' was sufficient
+        # but here it is most convenient to say 'outfp = io.StringIO()'.
+        outfp = io.StringIO()
+        device = converter.TextConverter(rsrcmgr, outfp, laparams=laparams)
+        start = time.monotonic()
+        try:
+            parser = pdfparser.PDFParser(io.BytesIO(payload))
+            doc = pdfparser.PDFDocument(caching=True)
+            parser.set_document(doc)
+            doc.set_parser(parser)
+            doc.initialize("")
+            if not doc.is_extractable:
+                raise pdfinterp.PDFTextExtractionNotAllowed(
+                    "Text extraction is not allowed"
+                )
+            interpreter = pdfinterp.PDFPageInterpreter(rsrcmgr, device)
+            count = 0
+            for pageno, page in enumerate(doc.get_pages(), start=1):
+                if self._is_past_last_page(pageno):
+                    break
+                if not self._is_page_selected(pageno):
+                    continue
+                if self.max_pages and count >= self.max_pages:
+                    break
+                if (
+                    self.time_limit
+                    and time.monotonic() - start > self.time_limit
+                ):
+                    failure = "".join(
+                        (
+                            "stopped after ",
+                            str(self.time_limit),
+                            " seconds at page ",
+                            str(pageno),
+                        )
+                    )
+                    break
+                interpreter.process_page(page)
+                count += 1
+        finally:
+            device.close()
+        return outfp.getvalue(), failure
@@ -0,0 +1,100 @@
+# test_compression.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""compression tests."""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from . import compression
+
+# Text like the text in a difference file.
+_DATA = "".join("  line " + str(i) + "\n" for i in range(100)).encode()
+
+
+class Compression(unittest.TestCase):
+    """Data compressed by each compression is found and decompressed."""
+
+    def test_01_uncompressed(self):
+        """Uncompressed data is left alone."""
+        self.assertIsNone(compression.compression_of(_DATA))
+        self.assertEqual(compression.compress(_DATA, None), _DATA)
+        self.assertEqual(compression.decompress(_DATA), _DATA)
+        self.assertEqual(
+            compression.open_decompressed(io.BytesIO(_DATA)).read(), _DATA
+        )
+        self.assertEqual(compression.decompress(b""), b"")
+
+    def test_02_compressed(self):
+        """Data is found to be compressed and is decompressed."""
+        for name in compression.COMPRESSIONS:
+            data = compression.compress(_DATA, name)
+            self.assertNotEqual(data, _DATA)
+            self.assertEqual(compression.compression_of(data), name)
+            self.assertEqual(compression.decompress(data), _DATA)
+            self.assertEqual(
+                compression.open_decompressed(io.BytesIO(data)).read(), _DATA
+            )
+
+
+class RecompressDirectory(unittest.TestCase):
+    """Files in a directory are rewritten with the compression named."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, "subdirectory"))
+        for name in (None,) + compression.COMPRESSIONS:
+            self.write(str(name), compression.compress(_DATA, name))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        """Write data to file name in directory."""
+        with open(os.path.join(self.directory, name), "wb") as file:
+            file.write(data)
+
+    def compressions(self):
+        """Return dict of compression of each file in directory by name."""
+        compressions = {}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not os.path.isfile(path):
+                continue
+            with open(path, "rb") as file:
+                data = file.read()
+            self.assertEqual(compression.decompress(data), _DATA)
+            compressions[name] = compression.compression_of(data)
+        return compressions
+
+    def test_01_compress(self):
+        """Files not compressed by the compression are rewritten."""
+        for name, count in zip(compression.COMPRESSIONS, (3, 4, 4)):
+            self.assertEqual(
+                compression.recompress_directory(self.directory, name), count
+            )
+            self.assertEqual(
+                set(self.compressions().values()), {name}, msg=name
+            )
+
+    def test_02_uncompress(self):
+        """Compressed files are rewritten uncompressed."""
+        self.assertEqual(
+            compression.recompress_directory(self.directory, None), 3
+        )
+        self.assertEqual(set(self.compressions().values()), {None})
+        self.assertEqual(
+            compression.recompress_directory(self.directory, None), 0
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted(("subdirectory", "None") + compression.COMPRESSIONS),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
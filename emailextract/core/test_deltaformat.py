@@ -0,0 +1,92 @@
+# test_deltaformat.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""deltaformat tests."""
+
+import difflib
+import io
+import random
+import unittest
+
+from . import deltaformat
+
+
+def _read_back(text):
+    """Return lines of text split at universal newlines like a file read."""
+    return io.StringIO(text, newline=None).readlines()
+
+
+class CompactExpand(unittest.TestCase):
+    """Deltas restore the text restored from the ndiff lines read back."""
+
+    def check(self, original, edited):
+        """Assert delta of ndiff(original, edited) restores the same text.
+
+        Return the ndiff lines given by the delta.
+
+        """
+        differences = list(difflib.ndiff(original, edited))
+        delta = _read_back(deltaformat.compact_delta(differences))
+        self.assertTrue(deltaformat.is_delta(delta))
+        expanded = deltaformat.expand_delta(delta)
+        read_back = _read_back("".join(differences))
+        for which in 1, 2:
+            self.assertEqual(
+                "".join(difflib.restore(expanded, which)),
+                "".join(difflib.restore(read_back, which)),
+            )
+        return expanded
+
+    def test_01_fuzz(self):
+        """Random texts with tabs and carriage returns restore correctly."""
+        generator = random.Random(1)
+        for _ in range(500):
+            original, edited = (
+                "".join(
+                    generator.choice("ab \t\r\n")
+                    for _ in range(generator.randrange(40))
+                ).splitlines(True)
+                for _ in range(2)
+            )
+            self.check(original, edited)
+
+    def test_02_identical(self):
+        """Text without edits has no hunks."""
+        expanded = self.check(["a\n", "b\n"], ["a\n", "b\n"])
+        self.assertEqual(expanded, ["  a\n", "  b\n"])
+
+    def test_03_hint_with_carriage_return(self):
+        """The parts of a hint split at a carriage return are ignored."""
+        self.assertEqual(
+            deltaformat.expand_delta(
+                _read_back(
+                    deltaformat.compact_delta(
+                        ["- ab\n", "? ^\rx ^\n", "+ cd\n", "? ^\n", "  e\n"]
+                    )
+                )
+            ),
+            ["- ab\n", "+ cd\n", "  e\n"],
+        )
+        self.check(["x\r  yy\n"], ["x\r  yz\n"])
+
+    def test_04_untagged_line(self):
+        """A line which does not start with a tag and is not a hint fails."""
+        with self.assertRaises(ValueError):
+            deltaformat.compact_delta(["  a\n", "b\n"])
+
+    def test_05_no_trailing_newline(self):
+        """The last original or added line may not end with newline."""
+        expanded = self.check(["a\n", "b"], ["c\n", "b"])
+        self.assertEqual(expanded, ["- a\n", "+ c\n", "  b"])
+        expanded = self.check(["a\n", "b\n"], ["a\n", "c"])
+        self.assertEqual(expanded, ["  a\n", "- b\n", "+ c"])
+        expanded = self.check(["a\n", "b"], ["a\n"])
+        self.assertEqual(expanded, ["  a\n", "- b"])
+        self.check(["a"], ["a"])
+        self.check([], ["a"])
+        self.check(["a"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# test_differencestore.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""differencestore tests."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from . import differencestore
+
+
+class _Store(unittest.TestCase):
+    """Difference store in a temporary directory."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = differencestore.DifferenceStore(
+            os.path.join(self.directory, "store")
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+class DifferenceStore(_Store):
+    """Records and fingerprints are stored and read back."""
+
+    def test_01_empty(self):
+        """A new store has no records or fingerprints."""
+        self.assertEqual(self.store.names(), [])
+        self.assertIsNone(self.store.get("a.mbs"))
+        self.assertFalse(self.store.exists("a.mbs"))
+        self.assertEqual(self.store.get_fingerprints(), {})
+
+    def test_02_records(self):
+        """Records are read back unchanged."""
+        self.store.put_all([("b.mbs", b"\x00b\r\n"), ("a.mbs", b"a")])
+        self.assertEqual(self.store.names(), ["a.mbs", "b.mbs"])
+        self.assertEqual(self.store.get("b.mbs"), b"\x00b\r\n")
+        self.assertTrue(self.store.exists("a.mbs"))
+        self.store.put_all([("a.mbs", b"new a")])
+        self.assertEqual(self.store.get("a.mbs"), b"new a")
+        self.assertEqual(self.store.names(), ["a.mbs", "b.mbs"])
+
+    def test_03_failed_put_all(self):
+        """No records are added if one cannot be added."""
+        with self.assertRaises(differencestore.DifferenceStoreError):
+            self.store.put_all([("a.mbs", b"a"), ("b.mbs", object())])
+        self.assertEqual(self.store.names(), [])
+
+    def test_04_fingerprints(self):
+        """A fingerprint is kept until it's record is replaced."""
+        self.store.put_all([("a.mbs", b"a"), ("b.mbs", b"b")])
+        self.store.put_fingerprints([("a.mbs", "da"), ("b.mbs", "db")])
+        self.assertEqual(
+            self.store.get_fingerprints(),
+            {"a.mbs": ("da",), "b.mbs": ("db",)},
+        )
+        self.store.put_all([("a.mbs", b"new a")])
+        self.assertEqual(self.store.get_fingerprints(), {"b.mbs": ("db",)})
+
+    def test_05_unusable_database(self):
+        """A store which cannot be opened has no fingerprints."""
+        store = differencestore.DifferenceStore(self.directory)
+        self.assertEqual(store.get_fingerprints(), {})
+        store.put_fingerprints([("a.mbs", "da")])
+        with self.assertRaises(differencestore.DifferenceStoreError):
+            store.names()
+
+
+class PackUnpack(_Store):
+    """Records are moved between files and the store unchanged."""
+
+    def test_01_unpack(self):
+        """Records are written to files, replacing existing files."""
+        extracted = os.path.join(self.directory, "extracted")
+        self.store.put_all([("a.mbs", b"a\r\n"), ("b.mbs", b"")])
+        self.assertEqual(differencestore.unpack(self.store.path, extracted), 2)
+        self.assertEqual(sorted(os.listdir(extracted)), ["a.mbs", "b.mbs"])
+        with open(os.path.join(extracted, "a.mbs"), "rb") as file:
+            self.assertEqual(file.read(), b"a\r\n")
+        self.store.put_all([("a.mbs", b"new a")])
+        self.assertEqual(differencestore.unpack(self.store.path, extracted), 2)
+        with open(os.path.join(extracted, "a.mbs"), "rb") as file:
+            self.assertEqual(file.read(), b"new a")
+
+    def test_02_unpack_empty(self):
+        """No directory is created for a store without records."""
+        extracted = os.path.join(self.directory, "extracted")
+        self.assertEqual(differencestore.unpack(self.store.path, extracted), 0)
+        self.assertFalse(os.path.exists(extracted))
+
+    def test_03_pack_unpack(self):
+        """Files packed and unpacked are the same files."""
+        extracted = os.path.join(self.directory, "extracted")
+        os.mkdir(extracted)
+        os.mkdir(os.path.join(extracted, "subdirectory"))
+        for name in "a.mbs", "b.mbs":
+            with open(os.path.join(extracted, name), "wb") as file:
+                file.write(name.encode())
+        self.assertEqual(differencestore.pack(extracted, self.store.path), 2)
+        unpacked = os.path.join(self.directory, "unpacked")
+        self.assertEqual(differencestore.unpack(self.store.path, unpacked), 2)
+        for name in "a.mbs", "b.mbs":
+            with open(os.path.join(unpacked, name), "rb") as file:
+                self.assertEqual(file.read(), name.encode())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,393 @@
+# test_emailextractor.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""emailextractor tests."""
+
+import difflib
+import email.message
+import io
+import os
+import shutil
+import tempfile
+import types
+import unittest
+import unittest.mock
+import zipfile
+
+from . import emailextractor
+from .emailextractor import _identity_ndiff, _sorted_listing
+from .test_extractors import _FooExtractor
+
+
+class IdentityNdiff(unittest.TestCase):
+    """_identity_ndiff gives the same lines as difflib.ndiff(lines, lines)."""
+
+    def check(self, lines):
+        """Assert _identity_ndiff(lines) is difflib.ndiff(lines, lines)."""
+        self.assertEqual(
+            list(_identity_ndiff(lines)),
+            list(difflib.ndiff(lines, lines)),
+        )
+
+    def test_01_empty(self):
+        """No lines."""
+        self.check([])
+
+    def test_02_trailing_newline(self):
+        """Last line ends with newline."""
+        self.check("first line\nsecond line\n".splitlines(True))
+
+    def test_03_no_trailing_newline(self):
+        """Last line does not end with newline."""
+        self.check("first line\nsecond line".splitlines(True))
+
+    def test_04_blank_lines(self):
+        """Blank lines."""
+        self.check("\n\nline\n\n".splitlines(True))
+
+    def test_05_tabs(self):
+        """Lines containing tabs."""
+        self.check("\tindented\ncol1\tcol2\t\n\t".splitlines(True))
+
+    def test_06_carriage_returns(self):
+        """Lines ending with carriage return."""
+        self.check("a\r\nb\rc\n".splitlines(True))
+
+
+class SortedListing(unittest.TestCase):
+    """Directory listings are cached only if the directory is not recent."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def add(self, name, mtime_ns=None):
+        """Add file name to directory and set directory mtime to mtime_ns."""
+        with open(os.path.join(self.directory, name), "wb"):
+            pass
+        if mtime_ns is not None:
+            os.utime(self.directory, ns=(mtime_ns, mtime_ns))
+
+    def test_01_recent(self):
+        """A directory modified recently is listed again."""
+        self.add("b")
+        self.assertEqual(_sorted_listing(self.directory), ["b"])
+        mtime = os.stat(self.directory).st_mtime_ns
+        self.add("a", mtime_ns=mtime)
+        self.assertEqual(_sorted_listing(self.directory), ["a", "b"])
+
+    def test_02_not_recent(self):
+        """A directory not modified recently is listed once per mtime."""
+        mtime = os.stat(self.directory).st_mtime_ns - 10000000000
+        self.add("b", mtime_ns=mtime)
+        self.assertEqual(_sorted_listing(self.directory), ["b"])
+        self.add("a", mtime_ns=mtime)
+        self.assertEqual(_sorted_listing(self.directory), ["b"])
+        self.add("c", mtime_ns=mtime + 1)
+        self.assertEqual(_sorted_listing(self.directory), ["a", "b", "c"])
+
+
+def _docx(text):
+    """Return bytes of a docx document containing text."""
+    document = io.BytesIO()
+    with zipfile.ZipFile(document, "w") as archive:
+        archive.writestr(
+            "word/document.xml",
+            "".join(
+                (
+                    "<w:document xmlns:w=",
+                    '"http://schemas.openxmlformats.org/',
+                    'wordprocessingml/2006/main"><w:body><w:p><w:r>',
+                    "<w:t>",
+                    text,
+                    "</w:t></w:r></w:p></w:body></w:document>",
+                )
+            ),
+        )
+    return document.getvalue()
+
+
+class _Event(unittest.TestCase):
+    """Event directory with emails in it's collected directory."""
+
+    # The configuration file lines common to all the tests.
+    configuration = (
+        "collected collected",
+        "extracted extracted",
+        "text_content_type text/plain",
+    )
+
+    def setUp(self):
+        self.eventdirectory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.eventdirectory, "collected"))
+
+    def tearDown(self):
+        shutil.rmtree(self.eventdirectory)
+
+    def write_email(self, day, attachments, headers=()):
+        """Write email with (filename, maintype, subtype, payload) attachments.
+
+        headers is a sequence of (name, value) pairs added to the email.
+
+        """
+        message = email.message.EmailMessage()
+        message["From"] = "sender@example.org"
+        message["Date"] = "".join((str(day), " Jan 2020 10:00:00 +0000"))
+        for name, value in headers:
+            message[name] = value
+        message.set_content("Body " + str(day))
+        for filename, maintype, subtype, payload in attachments:
+            message.add_attachment(
+                payload, maintype=maintype, subtype=subtype, filename=filename
+            )
+        with open(
+            os.path.join(
+                self.eventdirectory,
+                "collected",
+                "".join(
+                    (
+                        "202001",
+                        str(day).zfill(2),
+                        "100000sender@example.org+0000.mbs",
+                    )
+                ),
+            ),
+            "wb",
+        ) as mbs:
+            mbs.write(message.as_bytes())
+
+    def email_extractor(self, *lines):
+        """Return parsed EmailExtractor for configuration and lines."""
+        extractor = emailextractor.EmailExtractor(
+            self.eventdirectory,
+            configuration="\n".join(self.configuration + lines),
+        )
+        self.assertTrue(extractor.parse())
+        return extractor
+
+
+class ExtractWorkers(_Event):
+    """Text extracted by worker processes is text extracted serially."""
+
+    configuration = _Event.configuration + (
+        "csv_content_type text/csv",
+        "docx_content_type application/docx",
+    )
+
+    def setUp(self):
+        super().setUp()
+        attachments = (
+            ("r.csv", "text", "csv", "a;b\n\xe9t\xe9;1\n".encode("latin-1")),
+            ("r.csv", "text", "csv", "a;b\n\xe9t\xe9;2\n".encode("utf-8")),
+            ("n.csv", "text", "csv", b"a,b\n1,\x002\n"),
+            ("d.docx", "application", "docx", _docx("document")),
+        )
+        for day, attachment in enumerate(attachments * 2, start=1):
+            self.write_email(day, (attachment,))
+
+    def extracted_text(self, workers):
+        """Return list of text extracted from emails using workers."""
+        extractor = self.email_extractor("extract_workers " + str(workers))
+        with unittest.mock.patch(
+            "tkinter.messagebox.askquestion",
+            return_value=emailextractor.tkinter.messagebox.YES,
+        ) as askquestion:
+            extractor.extract_text()
+            text = [e.extracted_text for e in extractor.selected_emails]
+        self.assertEqual(askquestion.call_count, 2)
+        return text
+
+    def test_01_serial_and_parallel(self):
+        """Text from 3 worker processes is text from 1 process."""
+        serial = self.extracted_text(1)
+        self.assertEqual(len(serial), 8)
+        self.assertEqual(self.extracted_text(3), serial)
+
+
+class CsvDelimiter(_Event):
+    """Csv text is included if the delimiter is one of the accepted ones."""
+
+    configuration = _Event.configuration + ("csv_content_type text/csv",)
+
+    def test_01_tab(self):
+        """Tab separated text is included."""
+        self.write_email(1, (("t.csv", "text", "csv", b"a\tb\n1\t2\n"),))
+        selected = self.email_extractor().selected_emails[0]
+        self.assertEqual(selected.extracted_text, ["Body 1\n", "a\tb\n1\t2\n"])
+
+
+class CopyEmailsFingerprints(_Event):
+    """Fingerprints are kept only if configured or in a difference store."""
+
+    def setUp(self):
+        super().setUp()
+        self.write_email(1, ())
+        self.write_email(2, ())
+
+    def copy_emails(self, *lines):
+        """Return event directory files after copy_emails for lines."""
+        extractor = self.email_extractor(*lines)
+        with unittest.mock.patch(
+            "tkinter.messagebox.askquestion",
+            return_value=emailextractor.tkinter.messagebox.YES,
+        ):
+            extractor.copy_emails()
+        return sorted(os.listdir(self.eventdirectory))
+
+    def test_01_not_configured(self):
+        """No fingerprints are kept without a difference_fingerprints line."""
+        self.assertEqual(self.copy_emails(), ["collected", "extracted"])
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.eventdirectory, "extracted"))),
+            2,
+        )
+
+    def test_02_configured(self):
+        """Fingerprints of difference files are kept in the database."""
+        line = "difference_fingerprints extracted.fingerprints"
+        self.assertIn("extracted.fingerprints", self.copy_emails(line))
+        fingerprints = emailextractor.DifferenceFingerprints(
+            os.path.join(self.eventdirectory, "extracted.fingerprints")
+        ).get_fingerprints()
+        self.assertEqual(
+            sorted(fingerprints),
+            sorted(os.listdir(os.path.join(self.eventdirectory, "extracted"))),
+        )
+        self.copy_emails(line)
+        self.assertEqual(
+            emailextractor.DifferenceFingerprints(
+                os.path.join(self.eventdirectory, "extracted.fingerprints")
+            ).get_fingerprints(),
+            fingerprints,
+        )
+
+    def test_03_difference_store(self):
+        """Fingerprints of records are kept in the difference store."""
+        self.assertEqual(
+            self.copy_emails(
+                "difference_store extracted.store",
+                "difference_fingerprints extracted.fingerprints",
+            ),
+            ["collected", "extracted.store"],
+        )
+        store = emailextractor.DifferenceStore(
+            os.path.join(self.eventdirectory, "extracted.store")
+        )
+        self.assertEqual(len(store.names()), 2)
+        self.assertEqual(sorted(store.get_fingerprints()), store.names())
+
+
+class MailstoreIndexDates(_Event):
+    """Dates read from the mailstore index are dates read from the email."""
+
+    def test_01_folded_date(self):
+        """A folded Date header is one date in the index."""
+        with open(
+            os.path.join(
+                self.eventdirectory,
+                "collected",
+                "20200101100000sender@example.org+0000.mbs",
+            ),
+            "wb",
+        ) as mbs:
+            mbs.write(
+                b"".join(
+                    (
+                        b"From: sender@example.org\r\n",
+                        b"Date: Wed, 1 Jan 2020\r\n 10:00:00 +0000\r\n",
+                        b"Delivery-Date: Wed, 1 Jan 2020\r\n",
+                        b"\t10:05:00 +0000\r\n",
+                        b"\r\n",
+                        b"Body 1\r\n",
+                    )
+                )
+            )
+        dates = (
+            [(2020, 1, 1, 10, 0, 0, 0, 1, -1)],
+            [(2020, 1, 1, 10, 5, 0, 0, 1, -1)],
+        )
+        for _ in range(2):
+            selected = self.email_extractor(
+                "mailstore_index index.db"
+            ).selected_emails
+            self.assertEqual(len(selected), 1)
+            self.assertEqual(selected[0].dates, dates)
+        self.assertIsNotNone(selected[0].index_entry)
+
+
+class ConvertSpreadsheets(_Event):
+    """Spreadsheets converted together report failures like serial ones."""
+
+    configuration = _Event.configuration + (
+        "ss_content_type application/vnd.oasis.opendocument.spreadsheet",
+    )
+
+    def test_01_conversion_raises(self):
+        """An exception converting one spreadsheet is a conversion failure."""
+        self.write_email(
+            1,
+            (
+                (
+                    "book.ods",
+                    "application",
+                    "vnd.oasis.opendocument.spreadsheet",
+                    b"not a spreadsheet",
+                ),
+            ),
+        )
+        with unittest.mock.patch(
+            "emailextract.core.emailextractor._SSTOCSV", "ssconvert"
+        ), unittest.mock.patch.object(
+            emailextractor.ExtractText,
+            "convert_spreadsheet_using_gnumeric",
+            side_effect=OSError("no scratch space"),
+        ):
+            extractor = self.email_extractor()
+            emails = extractor.selected_emails
+            extractor.email_client.convert_spreadsheets(emails)
+            selected = emails[0]
+            self.assertEqual(
+                selected.extracted_text,
+                [
+                    "Body 1\n",
+                    "".join(
+                        (
+                            "Cannot process 'book.ods': ssconvert could not ",
+                            "be run: no scratch space.\n",
+                        )
+                    ),
+                ],
+            )
+            self.assertEqual(
+                selected.conversion_failures,
+                [("book.ods", "could not be run: no scratch space")],
+            )
+
+
+class EntryPointExtractor(_Event):
+    """Text is extracted by an extractor given by an entry point."""
+
+    def test_01_extract(self):
+        """The entry point's extractor, not ssconvert, converts the part."""
+        self.write_email(1, (("x.foo", "application", "foo", b"text"),))
+        with unittest.mock.patch(
+            "emailextract.core.extractors._entry_points",
+            return_value=(
+                types.SimpleNamespace(name="foo", load=lambda: _FooExtractor),
+            ),
+        ), unittest.mock.patch(
+            "emailextract.core.emailextractor._SSTOCSV", "ssconvert"
+        ):
+            extractor = self.email_extractor()
+            selected = extractor.selected_emails[0]
+            self.assertEqual(selected.spreadsheet_attachments(), [])
+            self.assertEqual(
+                selected.extracted_text, ["Body 1\n", "foo: text\n"]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
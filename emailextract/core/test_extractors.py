@@ -0,0 +1,104 @@
+# test_extractors.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""extractors tests."""
+
+import types
+import unittest
+import unittest.mock
+
+from . import extractors
+
+
+def _entry_point(name, extractor_class):
+    """Return entry point called name which loads extractor_class."""
+    return types.SimpleNamespace(name=name, load=lambda: extractor_class)
+
+
+class _FooExtractor(extractors.Extractor):
+    """Extractor for application/foo attachments."""
+
+    name = "foo"
+    kind = ".foo"
+    default_content_types = frozenset(("application/foo",))
+
+    def extract(self, extracttext, filename, payload, text, charset=None):
+        """Append payload decoded as ascii to text list."""
+        del extracttext, filename, charset
+        text.append("".join(("foo: ", payload.decode("ascii"))))
+
+
+class _NoKindExtractor(_FooExtractor):
+    """Extractor which does not set kind."""
+
+    name = "nokind"
+    kind = None
+    default_content_types = frozenset(("application/nokind",))
+
+
+class _SameKindExtractor(_FooExtractor):
+    """Extractor with the same kind as _FooExtractor."""
+
+    name = "samekind"
+    default_content_types = frozenset(("application/samekind",))
+
+
+class ExtractorRegistry(unittest.TestCase):
+    """Extractors given by entry points are registered by kind."""
+
+    def load(self, *entry_points):
+        """Return (registry, failures) after loading entry_points."""
+        registry = extractors.ExtractorRegistry()
+        with unittest.mock.patch(
+            "emailextract.core.extractors._entry_points",
+            return_value=entry_points,
+        ):
+            failures = registry.load_entry_points(None)
+        return registry, failures
+
+    def test_01_register(self):
+        """An extractor is found by content type, kind, and filename."""
+        registry, failures = self.load(_entry_point("foo", _FooExtractor))
+        self.assertEqual(failures, [])
+        extractor = registry.for_content_type("application/foo")
+        self.assertIsInstance(extractor, _FooExtractor)
+        self.assertIs(registry.for_kind(".foo"), extractor)
+        self.assertIs(registry.for_filename("X.FOO"), extractor)
+        self.assertIsNone(registry.for_filename("x.bar"))
+        self.assertEqual(registry.configured(), [extractor])
+
+    def test_02_no_kind(self):
+        """An extractor without a kind is a failure and not registered."""
+        registry, failures = self.load(
+            _entry_point("nokind", _NoKindExtractor)
+        )
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0][0], "nokind")
+        self.assertIsInstance(failures[0][1], extractors.ExtractorError)
+        self.assertIsNone(registry.for_content_type("application/nokind"))
+        self.assertEqual(registry.configured(), [])
+
+    def test_03_same_kind(self):
+        """The second extractor with a kind is a failure."""
+        registry, failures = self.load(
+            _entry_point("foo", _FooExtractor),
+            _entry_point("samekind", _SameKindExtractor),
+        )
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0][0], "samekind")
+        self.assertIsInstance(failures[0][1], extractors.ExtractorError)
+        self.assertIsInstance(registry.for_kind(".foo"), _FooExtractor)
+        self.assertIsNone(registry.for_content_type("application/samekind"))
+
+    def test_04_spreadsheet_kind_not_extension(self):
+        """A kind which is not an extension does not match a filename."""
+        registry = extractors.ExtractorRegistry()
+        extractor = _FooExtractor()
+        extractor.kind = "foo"
+        registry.register(extractor, ())
+        self.assertIsNone(registry.for_filename("x.foo"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,227 @@
+# test_officexml.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""officexml tests."""
+
+import io
+import unittest
+import zipfile
+
+try:
+    import xlsx2csv
+except ImportError:  # Not ModuleNotFoundError for Pythons earlier than 3.6
+    xlsx2csv = None
+
+from . import officexml
+
+_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_RELATIONSHIPS = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+)
+_PACKAGE_RELATIONSHIPS = (
+    "http://schemas.openxmlformats.org/package/2006/relationships"
+)
+_WORKSHEET_TYPE = _RELATIONSHIPS + "/worksheet"
+_SPREADSHEETML = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+
+
+def _worksheet(rows, dimension):
+    """Return worksheet XML with rows and dimension reference."""
+    return "".join(
+        (
+            '<worksheet xmlns="',
+            _MAIN,
+            '"><dimension ref="',
+            dimension,
+            '"/><sheetData>',
+            "".join(rows),
+            "</sheetData></worksheet>",
+        )
+    )
+
+
+# The members of a workbook with shared strings, inline strings, dates and
+# times, numbers, booleans, hidden and sparse rows, and sparse cells.
+_WORKBOOK = {
+    "[Content_Types].xml": "".join(
+        (
+            '<Types xmlns="',
+            "http://schemas.openxmlformats.org/package/2006/content-types",
+            '"><Override PartName="/xl/workbook.xml" ContentType="',
+            _SPREADSHEETML,
+            ".sheet.main+xml",
+            '"/><Override PartName="/xl/sharedStrings.xml" ContentType="',
+            _SPREADSHEETML,
+            ".sharedStrings+xml",
+            '"/><Override PartName="/xl/styles.xml" ContentType="',
+            _SPREADSHEETML,
+            ".styles+xml",
+            '"/></Types>',
+        )
+    ),
+    "_rels/.rels": "".join(
+        (
+            '<Relationships xmlns="',
+            _PACKAGE_RELATIONSHIPS,
+            '"><Relationship Id="rId1" Target="xl/workbook.xml" Type="',
+            _RELATIONSHIPS,
+            '/officeDocument"/></Relationships>',
+        )
+    ),
+    "xl/workbook.xml": "".join(
+        (
+            '<workbook xmlns="',
+            _MAIN,
+            '" xmlns:r="',
+            _RELATIONSHIPS,
+            '"><workbookPr/><sheets>',
+            '<sheet name="Names" sheetId="1" r:id="rId2"/>',
+            '<sheet name="Sparse" sheetId="2" r:id="rId1"/>',
+            "</sheets></workbook>",
+        )
+    ),
+    "xl/_rels/workbook.xml.rels": "".join(
+        (
+            '<Relationships xmlns="',
+            _PACKAGE_RELATIONSHIPS,
+            '"><Relationship Id="rId1" Target="worksheets/sheet2.xml" Type="',
+            _WORKSHEET_TYPE,
+            '"/><Relationship Id="rId2" Target="worksheets/sheet1.xml" Type="',
+            _WORKSHEET_TYPE,
+            '"/></Relationships>',
+        )
+    ),
+    "xl/sharedStrings.xml": "".join(
+        (
+            '<sst xmlns="',
+            _MAIN,
+            '"><si><t>Name</t></si><si><t>Born</t></si>',
+            '<si><r><t>Ann</t></r><r><t xml:space="preserve"> Smith</t></r>',
+            "<rPh><t>phonetic</t></rPh></si>",
+            "<si><t>Line 1\nLine 2</t></si></sst>",
+        )
+    ),
+    "xl/styles.xml": "".join(
+        (
+            '<styleSheet xmlns="',
+            _MAIN,
+            '"><numFmts><numFmt numFmtId="164" formatCode="dd/mm/yyyy"/>',
+            "</numFmts><cellXfs>",
+            '<xf numFmtId="0"/><xf numFmtId="164"/><xf numFmtId="2"/>',
+            '<xf numFmtId="20"/>',
+            "</cellXfs></styleSheet>",
+        )
+    ),
+    "xl/worksheets/sheet1.xml": _worksheet(
+        (
+            '<row r="1"><c r="A1" t="s"><v>0</v></c>',
+            '<c r="B1" t="s"><v>1</v></c></row>',
+            '<row r="2"><c r="A2" t="s"><v>2</v></c>',
+            '<c r="B2" s="1"><v>36526</v></c>',
+            '<c r="C2" s="2"><v>1.5</v></c></row>',
+            '<row r="3" hidden="1"><c r="A3" t="s"><v>0</v></c></row>',
+            '<row r="4"><c r="A4" t="s"><v>3</v></c>',
+            '<c r="B4" s="3"><v>0.75</v></c>',
+            '<c r="C4" t="b"><v>1</v></c></row>',
+        ),
+        "A1:C4",
+    ),
+    "xl/worksheets/sheet2.xml": _worksheet(
+        (
+            '<row r="2"><c r="B2" t="inlineStr"><is><t>inline</t></is></c>',
+            '<c r="E2"><v>42</v></c></row>',
+            '<row r="3"><c r="A3" t="s"/></row>',
+            '<row r="5"><c r="C5"><v>1E-3</v></c></row>',
+        ),
+        "A1:F5",
+    ),
+}
+
+
+def _xlsx(members):
+    """Return bytes of xlsx zip archive containing members."""
+    workbook = io.BytesIO()
+    with zipfile.ZipFile(workbook, "w") as archive:
+        for name, xml in members.items():
+            archive.writestr(name, xml)
+    return workbook.getvalue()
+
+
+class XlsxWorkbook(unittest.TestCase):
+    """Sheets are converted to the csv text written by xlsx2csv."""
+
+    # The csv text of the sheets in _WORKBOOK.
+    expected = {
+        "Names": "".join(
+            (
+                "Name,Born,\n",
+                "Ann Smith,01/01/2000,1.50\n",
+                '"Line 1\nLine 2",18:00,TRUE\n',
+            )
+        ),
+        "Sparse": "".join(
+            (
+                ",inline,,,42,\n",
+                ",,1E-3,,,\n",
+            )
+        ),
+    }
+
+    def setUp(self):
+        self.workbook = officexml.XlsxWorkbook(
+            _WORKBOOK,
+            lambda name: io.BytesIO(_WORKBOOK[name].encode("utf-8")),
+            dateformat="%d/%m/%Y",
+        )
+
+    def test_01_sheets(self):
+        """Sheets are named in workbook order with their targets."""
+        self.assertEqual(
+            self.workbook.sheets,
+            [
+                ("Names", "worksheets/sheet1.xml"),
+                ("Sparse", "worksheets/sheet2.xml"),
+            ],
+        )
+
+    def test_02_shared_strings(self):
+        """Shared strings are joined runs without phonetic text."""
+        self.assertEqual(
+            self.workbook.shared_strings,
+            ["Name", "Born", "Ann Smith", "Line 1\nLine 2"],
+        )
+
+    def test_03_dates_and_shared_strings(self):
+        """Dates, times, and numbers are formatted by their styles."""
+        self.assertEqual(
+            self.workbook.sheet_csv("Names"), self.expected["Names"]
+        )
+
+    def test_04_sparse_cells(self):
+        """Missing cells and empty rows are given as xlsx2csv does."""
+        self.assertEqual(
+            self.workbook.sheet_csv("Sparse"), self.expected["Sparse"]
+        )
+
+    def test_05_absent_sheet(self):
+        """None is returned for a sheet not in the workbook."""
+        self.assertIsNone(self.workbook.sheet_csv("Absent"))
+
+    @unittest.skipIf(xlsx2csv is None, "xlsx2csv is not installed")
+    def test_06_xlsx2csv(self):
+        """The expected csv text is the text written by xlsx2csv."""
+        for index, sheet in enumerate(("Names", "Sparse"), start=1):
+            outfile = io.StringIO()
+            converter = xlsx2csv.Xlsx2csv(
+                io.BytesIO(_xlsx(_WORKBOOK)),
+                skip_empty_lines=True,
+                dateformat="%d/%m/%Y",
+                lineterminator="\n",
+            )
+            converter.convert(outfile, sheetid=index)
+            self.assertEqual(outfile.getvalue(), self.expected[sheet])
+
+
+if __name__ == "__main__":
+    unittest.main()
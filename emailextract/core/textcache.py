@@ -0,0 +1,147 @@
+# textcache.py
+# Copyright 2026 Roger Marsh
+# Licence: See LICENCE (BSD licence)
+
+"""Cache of text extracted from email attachments held in a sqlite3 database.
+
+The cache key is a hash of the decoded attachment and a description of the
+converter and options which produced the text, so an attachment sent in
+several emails is converted once.
+
+The least recently used entries are deleted when the total size of the text
+in the cache exceeds a limit.
+
+"""
+
+import sqlite3
+import hashlib
+import time
+
+# The default limit on total length of text held in cache.
+DEFAULT_CACHE_SIZE = 100000000
+
+_CREATE_TABLE = "".join(
+    (
+        "create table if not exists attachment_text (",
+        "key text primary key, ",
+        "text text, ",
+        "size integer, ",
+        "last_used integer)",
+    )
+)
+_SELECT = "select text from attachment_text where key = ?"
+_EXISTS = "select count(*) from attachment_text where key = ?"
+_TOUCH = "update attachment_text set last_used = ? where key = ?"
+_REPLACE = "insert or replace into attachment_text values (?, ?, ?, ?)"
+_TOTAL_SIZE = "select count(*), coalesce(sum(size), 0) from attachment_text"
+_OLDEST = "select key, size from attachment_text order by last_used"
+_DELETE = "delete from attachment_text where key = ?"
+
+
+class AttachmentTextCache:
+    """Persistent cache of text extracted from attachments.
+
+    The hits and misses counts are for the current process.
+
+    """
+
+    def __init__(self, path, max_size=None):
+        """Note cache database path and limit on total length of text."""
+        self.path = path
+        if max_size is None:
+            self.max_size = DEFAULT_CACHE_SIZE
+        else:
+            self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(payload, options):
+        """Return cache key for payload converted by converter with options.
+
+        options is a tuple of values which affect the text produced: the
+        converter and it's arguments for example.
+
+        """
+        digest = hashlib.sha256(payload)
+        digest.update(b"\x00")
+        digest.update(repr(options).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _connect(self):
+        """Return connection to cache database, creating table if needed."""
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(_CREATE_TABLE)
+        return connection
+
+    def get(self, key):
+        """Return text for key or None if not in cache."""
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    row = connection.execute(_SELECT, (key,)).fetchone()
+                    if row is not None:
+                        connection.execute(_TOUCH, (time.time_ns(), key))
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def contains(self, key):
+        """Return True if key is in cache without counting a hit or miss."""
+        try:
+            connection = self._connect()
+            try:
+                count = connection.execute(_EXISTS, (key,)).fetchone()[0]
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return False
+        return bool(count)
+
+    def put(self, key, text):
+        """Add text for key to cache and evict least recently used entries.
+
+        The cache is not changed if the database cannot be updated.
+
+        """
+        if len(text) > self.max_size:
+            return
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute(
+                        _REPLACE, (key, text, len(text), time.time_ns())
+                    )
+                    total = connection.execute(_TOTAL_SIZE).fetchone()[1]
+                    if total > self.max_size:
+                        for oldkey, size in connection.execute(
+                            _OLDEST
+                        ).fetchall():
+                            if total <= self.max_size:
+                                break
+                            connection.execute(_DELETE, (oldkey,))
+                            total -= size
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            pass
+
+    def statistics(self):
+        """Return (hits, misses, entries, total size) for the cache."""
+        try:
+            connection = self._connect()
+            try:
+                entries, size = connection.execute(_TOTAL_SIZE).fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            entries, size = None, None
+        return self.hits, self.misses, entries, size
@@ -536,7 +536,6 @@ class Select(Bindings):
         tags = self._tag_names
         for e, em in enumerate(self._email_collector.selected_emails):
             m = em.message
-            met = em.encoded_text
             textname = "x".join(("T", str(e)))
             tags.add(textname)
             entryname = "x".join(("M", str(e)))
@@ -550,7 +549,12 @@ class Select(Bindings):
             tw.insert(tkinter.END, "\n\n")
             tw.tag_add(fromname, fromstart, tw.index(tkinter.INSERT))
             start = tw.index(tkinter.INSERT)
-            tw.insert(tkinter.END, b"\n\n".join(met))
+
+            # Each part is decoded just before it is inserted in the widget.
+            for i, part in enumerate(em.iter_encoded_text()):
+                if i:
+                    tw.insert(tkinter.END, b"\n\n")
+                tw.insert(tkinter.END, part)
             tw.insert(tkinter.END, "\n")
             tw.tag_add(textname, start, tw.index(tkinter.INSERT))
             tw.insert(tkinter.END, "\n\n\n")
@@ -578,7 +582,8 @@ class Select(Bindings):
 
         The non-human readable parts in message become readable by eye.
 
-        Parts with Content-Transfer-Encoding set to base64 in other words.
+        Parts with Content-Transfer-Encoding set to base64 in other words,
+        but only those from which the extract rules take text.
 
         The possible encodings are base64, quoted-printable, 8bit, 7bit,
         binary, and x-token.
@@ -649,6 +654,7 @@ class Select(Bindings):
         # selected_emails_text can be recovered from the pointer position
         # over the widget.
         tags = self._tag_names
+        self._email_collector.extract_text()
         for e, em in enumerate(self._email_collector.selected_emails):
             m = em.message
             met = em.extracted_text
@@ -947,11 +953,7 @@ class Select(Bindings):
                         ),
                     )
                     return
-                fp = os.path.join(
-                    os.path.expanduser(self._email_collector.outputdirectory),
-                    filename,
-                )
-                if os.path.exists(fp):
+                if self._email_collector.difference_exists(filename):
                     if (
                         tkinter.messagebox.askquestion(
                             parent=self.get_toplevel(),
@@ -1012,9 +1014,8 @@ class Select(Bindings):
         start = w.index(" ".join((ti, "linestart")))
         end = w.index(" ".join((ti, "lineend")))
         filename = w.get(start, end).split(" ", 1)[-1]
-        od = os.path.expanduser(self._email_collector.outputdirectory)
-        fp = os.path.join(od, filename)
-        if os.path.exists(fp):
+        od = self._email_collector.difference_location
+        if self._email_collector.difference_exists(filename):
             self.statusbar.set_status_text(
                 " ".join((filename, "exists in output directory", od))
             )